@@ -0,0 +1,311 @@
+import os
+import io
+import csv
+import re
+import time
+import random
+import zlib
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import scrape_phone_emails_cli as cli
+
+# Local stand-in for the search engines and an end-to-end benchmark of run_scraper
+# The server answers with pages shaped like each engine's results, so the real
+# fetch, parse and write path runs without touching the network
+
+# Result markup per engine, matching the selectors in the CLI's engine registry
+RESULT_MARKUP = {
+    "duckduckgo": '<div class="result results_links web-result"><h2><a class="result__a" href="{link}">{title}</a></h2><a class="result__snippet">{snippet}</a></div>',
+    "bing": '<li class="b_algo"><h2><a href="{link}">{title}</a></h2><div class="b_caption"><p>{snippet}</p></div></li>',
+    "google": '<div class="g"><div><a href="{link}"><h3>{title}</h3></a></div><div><span>{snippet}</span></div></div>',
+    "yahoo": '<div class="dd algo algo-sr Sr"><div class="compTitle"><h3><a href="{link}">{title}</a></h3></div><div class="compText"><p>{snippet}</p></div></div>',
+    "ask": '<div class="PartialSearchResults-item"><a class="PartialSearchResults-item-title-link" href="{link}">{title}</a><p class="PartialSearchResults-item-abstract">{snippet}</p></div>',
+    "yandex": '<li class="serp-item serp-item_card"><h2><a href="{link}">{title}</a></h2><div class="OrganicText">{snippet}</div></li>',
+    "ecosia": '<article class="result web-result"><a class="result-title" href="{link}">{title}</a><p class="result-snippet">{snippet}</p></article>',
+    "startpage": '<div class="w-gl__result"><a class="w-gl__result-title" href="{link}"><h3>{title}</h3></a><p class="w-gl__description">{snippet}</p></div>',
+    "searx": '<div class="result result-default"><h3><a href="{link}">{title}</a></h3><p class="content">{snippet}</p></div>',
+}
+
+# Inline script padding so pages weigh about what real result pages do
+PAGE_PADDING = "<script>" + "var x=" + "0123456789abcdef" * 2000 + ";</script>"
+
+class ServerSettings:
+    """How the stand-in engines behave, shared by every request"""
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, block_rate=0.0, hit_rate=0.3, results=10, seed=0,
+                 decoy_rate=0.0, engine_hit_rates=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.hit_rate = hit_rate
+        self.engine_hit_rates = engine_hit_rates or {}
+        self.decoy_rate = decoy_rate
+        self.results = results
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.blocks = 0
+        self.hits = 0
+
+    def reset_counts(self):
+        with self.lock:
+            self.requests = self.errors = self.blocks = self.hits = 0
+
+    def roll(self):
+        """Return (delay, error, blocked) for one request"""
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter))
+            error = self.random.random() < self.error_rate
+            blocked = not error and self.random.random() < self.block_rate
+            self.errors += error
+            self.blocks += blocked
+            return delay, error, blocked
+
+    def is_hit(self, query, engine):
+        # Stable per query and engine, so reruns and other modes see the same answers
+        hit_rate = self.engine_hit_rates.get(engine, self.hit_rate)
+        return zlib.crc32(f"{engine}|{query}".encode("utf-8")) % 10000 < hit_rate * 10000
+
+    def has_decoy(self, query, engine):
+        """Whether the page also shows a brokerage office address above any real answer"""
+        return zlib.crc32(f"decoy|{engine}|{query}".encode("utf-8")) % 10000 < self.decoy_rate * 10000
+
+# Function to build a result page for a query the way an engine would lay it out
+def result_page(engine, query, hit, results=10, decoy=False):
+    markup = RESULT_MARKUP[engine]
+    match = re.search(r"realtor (.+?),", query)
+    name = match.group(1) if match else query
+    slug = "-".join(name.lower().split())
+    hit_position = zlib.crc32(query.encode("utf-8")) % min(5, results) if hit else -1
+    items = []
+    for i in range(results):
+        snippet = f"{name} is a licensed real estate agent serving the area. Call for listings and open houses."
+        if i == hit_position:
+            snippet += f" Contact: {'.'.join(name.lower().split())}@example-realty.com"
+        elif decoy and i == 0:
+            snippet += " Questions? Email our office at info@brokerage-example.com"
+        items.append(markup.format(
+            link=f"https://agents.example.com/{slug}/{i}",
+            title=f"{name} - Realtor profile {i + 1}",
+            snippet=snippet,
+        ))
+    return (f"<!DOCTYPE html><html><head><title>{query} - {engine}</title>{PAGE_PADDING}</head>"
+            f"<body><div id=\"results\">{''.join(items)}</div></body></html>")
+
+# Function to build the page an engine shows when it thinks it is talking to a bot
+def block_page(engine):
+    markers = cli.ENGINES[engine].block_markers
+    return f"<html><body><div>Unusual traffic detected. {markers[0] if markers else ''}</div></body></html>"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        settings = self.server.settings
+        parts = urlsplit(self.path)
+        engine = parts.path.strip("/").split("/", 1)[0]
+        params = parse_qs(parts.query)
+        query = next((params[key][0] for key in ("q", "p", "text", "query") if key in params), "")
+
+        delay, error, blocked = settings.roll()
+        time.sleep(delay)
+        if engine not in RESULT_MARKUP:
+            self.reply(404, "<html><body>Unknown engine</body></html>")
+        elif error:
+            self.reply(500, "<html><body>Internal error</body></html>")
+        elif blocked:
+            # Engines without a block page marker refuse with a status code instead
+            self.reply(200 if cli.ENGINES[engine].block_markers else 429, block_page(engine))
+        else:
+            hit = settings.is_hit(query, engine)
+            if hit:
+                with settings.lock:
+                    settings.hits += 1
+            self.reply(200, result_page(engine, query, hit, settings.results, settings.has_decoy(query, engine)))
+
+    def reply(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+# Function to start the stand-in server on a background thread
+def start_server(settings, host="127.0.0.1", port=0):
+    """Returns the server, its base URL is http://host:server.server_port"""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.settings = settings
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# Execution modes compared by the benchmark, as run_scraper keyword arguments
+MODES = {
+    "first-match": {"confidence": 0.0, "min_score": 0.0},
+    "sequential": {},
+    "concurrent": {"concurrency": 8},
+    "hedged": {"concurrency": 8, "hedge_k": 2},
+    "hedged-delay": {"concurrency": 8, "hedge_k": 1, "hedge_delay": 0.1},
+    "parse-pool": {"concurrency": 8, "parse_workers": 2},
+    "adaptive": {"adaptive": True, "engine_stats_file": None},
+    "adaptive-hedged": {"concurrency": 8, "hedge_k": 2, "adaptive": True, "engine_stats_file": None},
+}
+
+# Function to write a generated input file of realtor rows
+def write_input(path, rows, seed=0):
+    generator = random.Random(seed)
+    first_names = ["Amanda", "Becky", "Carlos", "Diane", "Ethan", "Fiona", "George", "Helen", "Ivan", "Julia"]
+    last_names = ["Osgood", "Nguyen", "Patel", "Garcia", "Smith", "Johnson", "Brown", "Lee", "Walker", "Young"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["First Name", "Last Name", "Phone"])
+        for i in range(rows):
+            writer.writerow([f"{generator.choice(first_names)}{i}", generator.choice(last_names), f"1512{generator.randrange(10**7):07d}"])
+
+# Function to pick a percentile from sorted values
+def percentile(values, share):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+# Function to run one mode end to end and measure it
+def run_mode(name, options, input_file, settings, work_dir, rate_limits=False):
+    """
+    Returns a dict of measurements
+    Row latency is timed around process_row, from the moment a lookup starts
+    searching until its answer is known
+    """
+    output_file = os.path.join(work_dir, f"{name}.csv")
+    if os.path.exists(output_file):
+        os.remove(output_file)
+
+    row_times = []
+    times_lock = threading.Lock()
+    process_row = cli.process_row
+
+    def timed_process_row(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return process_row(*args, **kwargs)
+        finally:
+            with times_lock:
+                row_times.append(time.perf_counter() - start)
+
+    settings.reset_counts()
+    cli.process_row = timed_process_row
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(log):
+            cli.run_scraper(input_file, 1, output_file=output_file, rate_limits=rate_limits,
+                            known_answers_file=None, dedupe=False, **options)
+    finally:
+        cli.process_row = process_row
+    elapsed = time.perf_counter() - start
+
+    with open(output_file, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))[1:]
+    found = sum(1 for row in rows if row[4])
+    # Only the stand-in agent addresses are right, office decoys count as found but wrong
+    correct = sum(1 for row in rows if row[4].endswith("@example-realty.com"))
+    row_times.sort()
+    return {
+        "mode": name,
+        "rows": len(rows),
+        "seconds": elapsed,
+        "rows_per_second": len(rows) / elapsed if elapsed else 0.0,
+        "p50": percentile(row_times, 0.50),
+        "p95": percentile(row_times, 0.95),
+        "p99": percentile(row_times, 0.99),
+        "requests": settings.requests,
+        "found": found,
+        "correct": correct,
+        "requests_per_email": settings.requests / correct if correct else float("inf"),
+        "errors": settings.errors,
+        "blocks": settings.blocks,
+    }
+
+# Function to run the benchmark over the chosen modes and print a table
+def benchmark(rows=100, modes=None, latency=0.05, jitter=0.02, error_rate=0.0, block_rate=0.0,
+              hit_rate=0.3, seed=0, decoy_rate=0.0, engine_hit_rates=None):
+    settings = ServerSettings(latency, jitter, error_rate, block_rate, hit_rate, seed=seed, decoy_rate=decoy_rate,
+                              engine_hit_rates=engine_hit_rates)
+    server = start_server(settings)
+    cli.set_engine_base_url(f"http://127.0.0.1:{server.server_port}")
+    print(f"Stand-in engines on port {server.server_port}: latency {latency * 1000:.0f}±{jitter * 1000:.0f} ms, "
+          f"hit rate {hit_rate:.0%}, decoys {decoy_rate:.0%}, errors {error_rate:.0%}, blocks {block_rate:.0%}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            input_file = os.path.join(work_dir, "input.csv")
+            write_input(input_file, rows, seed)
+            for name in modes or MODES:
+                print(f"Running {name} over {rows} rows...")
+                results.append(run_mode(name, MODES[name], input_file, settings, work_dir))
+    finally:
+        cli.set_engine_base_url()
+        server.shutdown()
+        server.server_close()
+
+    print()
+    print(f"{'mode':<14}{'rows/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'requests':>10}{'found':>7}{'correct':>9}{'req/email':>11}")
+    for r in results:
+        print(f"{r['mode']:<14}{r['rows_per_second']:>9.1f}{r['p50'] * 1000:>9.0f}{r['p95'] * 1000:>9.0f}"
+              f"{r['p99'] * 1000:>9.0f}{r['requests']:>10}{r['found']:>7}{r['correct']:>9}{r['requests_per_email']:>11.2f}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the scraper end to end against local stand-in search engines')
+    parser.add_argument('--rows', type=int, default=100,
+                        help='Generated input rows (default: 100)')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=None,
+                        help='Execution modes to run (default: all)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Mean response time in seconds (default: 0.05)')
+    parser.add_argument('--jitter', type=float, default=0.02,
+                        help='Standard deviation of the response time (default: 0.02)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Share of requests answered with HTTP 500 (default: 0)')
+    parser.add_argument('--block-rate', type=float, default=0.0,
+                        help='Share of requests answered with a block page (default: 0)')
+    parser.add_argument('--hit-rate', type=float, default=0.3,
+                        help='Share of result pages containing the agent\'s email (default: 0.3)')
+    parser.add_argument('--engine-hit-rate', action='append', default=[], metavar='ENGINE=RATE',
+                        help='Hit rate for one engine, overriding --hit-rate (repeatable)')
+    parser.add_argument('--decoy-rate', type=float, default=0.0,
+                        help='Share of result pages showing a brokerage office email first (default: 0)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the generated rows and server behaviour (default: 0)')
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help='Only run the stand-in server on PORT, for use with --engine-base-url')
+    args = parser.parse_args()
+    engine_hit_rates = {}
+    for spec in args.engine_hit_rate:
+        engine, _, rate = spec.partition("=")
+        engine_hit_rates[engine.strip()] = float(rate)
+
+    if args.serve is not None:
+        settings = ServerSettings(args.latency, args.jitter, args.error_rate, args.block_rate, args.hit_rate,
+                                  seed=args.seed, decoy_rate=args.decoy_rate, engine_hit_rates=engine_hit_rates)
+        server = start_server(settings, port=args.serve)
+        print(f"Stand-in engines at http://127.0.0.1:{server.server_port}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        benchmark(args.rows, args.modes, args.latency, args.jitter, args.error_rate, args.block_rate,
+                  args.hit_rate, args.seed, args.decoy_rate, engine_hit_rates)
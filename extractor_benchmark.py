@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import scrape_phone_emails_cli as cli
+from engine_benchmark import result_page, block_page
+
+# Microbenchmark of the result page extractor for every engine
+# Each engine gets a page with the agent's email, one without it, one with an
+# office address above the agent's, one with only the office address and a block
+# page. Parsing, first-match extraction and scoring against the row are timed
+# separately
+
+FIXTURE_QUERY = "Email for realtor Amanda Osgood, (832) 755-1673"
+FIXTURE_EMAIL = "amanda.osgood@example-realty.com"
+FIXTURE_TARGET = cli.query_target(FIXTURE_QUERY)
+MIN_SCORE = 0.3
+
+STAGES = ("parse_us", "extract_us", "score_us")
+
+# Function to build the fixture pages, as (engine, case, html, expected email after scoring)
+def build_fixtures():
+    fixtures = []
+    for engine in cli.ENGINES:
+        fixtures.append((engine, "found", result_page(engine, FIXTURE_QUERY, True), FIXTURE_EMAIL))
+        fixtures.append((engine, "not-found", result_page(engine, FIXTURE_QUERY, False), ""))
+        fixtures.append((engine, "decoy", result_page(engine, FIXTURE_QUERY, True, decoy=True), FIXTURE_EMAIL))
+        fixtures.append((engine, "decoy-only", result_page(engine, FIXTURE_QUERY, False, decoy=True), ""))
+        fixtures.append((engine, "block", block_page(engine), ""))
+    return fixtures
+
+# Function to time a call, returns the best seconds per call over several repeats
+def best_time(call, min_seconds=0.05, repeats=5):
+    """Like timeit: loops enough calls to fill min_seconds, and keeps the fastest repeat"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        loops *= 2
+    best = elapsed / loops
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            call()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+# Function to measure this machine's speed on work unrelated to the extractor
+def calibration_us(min_seconds=0.05, repeats=5):
+    """Lets a baseline saved on one machine, or under other load, be compared on another"""
+    text = "agent listing " * 500
+    return best_time(lambda: (sorted(range(2000), key=str), text.upper().split()), min_seconds, repeats) * 1e6
+
+# Function to time every fixture, returns {"engine/case": {"parse_us", "extract_us", "score_us"}}
+def measure(min_seconds=0.05, repeats=5):
+    results = {}
+    for engine, case, html, expected in build_fixtures():
+        root = cli.parse_results_page(html)
+        email = ""
+        if root is not None:
+            email, _, score = cli.best_candidate(root, engine, FIXTURE_TARGET)
+            if score < MIN_SCORE:
+                email = ""
+        if email != expected:
+            raise AssertionError(f"{engine}/{case}: expected {expected or 'no email'}, got {email or 'no email'}")
+        results[f"{engine}/{case}"] = {
+            "parse_us": best_time(lambda: cli.parse_results_page(html), min_seconds, repeats) * 1e6,
+            "extract_us": best_time(lambda: cli.extract_from_tree(root, engine), min_seconds, repeats) * 1e6,
+            "score_us": best_time(lambda: cli.best_candidate(root, engine, FIXTURE_TARGET), min_seconds, repeats) * 1e6,
+        }
+    return results
+
+# Function to add up each engine's fixtures, returns {engine: {stage: microseconds}}
+def engine_totals(results):
+    """Stages missing from an older baseline are left out of its totals"""
+    totals = {}
+    for name, timings in results.items():
+        engine = name.split("/", 1)[0]
+        total = totals.setdefault(engine, {})
+        for stage in STAGES:
+            if stage in timings:
+                total[stage] = total.get(stage, 0.0) + timings[stage]
+    return totals
+
+# Function to compare timings with a baseline, returns the regressions found
+def compare(results, baseline, tolerance=0.25, floor_us=5.0, scale=1.0):
+    """
+    An engine's extractor regresses when its parse or extraction time, summed over
+    its fixtures, is more than (1 + tolerance) times the baseline
+    Summing per engine smooths out the jitter of single sub-millisecond timings,
+    and differences under floor_us microseconds are ignored as noise
+    Baseline timings are first multiplied by scale, this machine's slowdown on
+    the calibration workload
+    """
+    regressions = []
+    before_totals = engine_totals(baseline)
+    for engine, timings in engine_totals(results).items():
+        before = before_totals.get(engine)
+        if before is None:
+            continue
+        for stage in STAGES:
+            if stage not in before:
+                continue
+            expected = before[stage] * scale
+            if timings[stage] > expected * (1 + tolerance) and timings[stage] - expected > floor_us:
+                regressions.append((engine, stage, expected, timings[stage]))
+    return regressions
+
+# Function to print the timings, with the change from the baseline when there is one
+def print_results(results, baseline):
+    print(f"{'fixture':<24}{'parse us':>10}{'extract us':>12}{'score us':>10}{'vs baseline':>14}")
+    for name, timings in results.items():
+        change = ""
+        before = baseline.get(name)
+        if before:
+            stages = [stage for stage in STAGES if stage in before]
+            old_total = sum(before[stage] for stage in stages)
+            new_total = sum(timings[stage] for stage in stages)
+            change = f"{(new_total / old_total - 1) * 100:+.0f}%"
+        print(f"{name:<24}{timings['parse_us']:>10.1f}{timings['extract_us']:>12.1f}{timings['score_us']:>10.1f}{change:>14}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the result page extractor per engine and check for regressions')
+    parser.add_argument('--baseline', default='extractor_baseline.json',
+                        help='Baseline timings file (default: extractor_baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Write this run\'s timings as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed slowdown over the baseline before failing (default: 0.5, lower it on a quiet machine)')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='Time spent per measurement (default: 0.05)')
+    args = parser.parse_args()
+
+    saved = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+    baseline = saved.get("fixtures", {})
+
+    calibration = calibration_us(args.min_seconds)
+    results = measure(args.min_seconds)
+    print_results(results, baseline)
+    scale = calibration / saved["calibration_us"] if saved else 1.0
+    if saved:
+        print(f"\nMachine speed vs baseline: {1 / scale:.2f}x")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"calibration_us": calibration, "fixtures": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif baseline:
+        regressions = compare(results, baseline, args.tolerance, scale=scale)
+        if regressions:
+            print(f"\n{len(regressions)} extractor timings are more than {args.tolerance:.0%} slower than the baseline:")
+            for name, stage, before, after in regressions:
+                print(f"  {name} {stage[:-3]}: expected {before:.1f} us, took {after:.1f} us")
+            sys.exit(1)
+        print(f"\nNo extractor is more than {args.tolerance:.0%} slower than the baseline")
+    else:
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline to create one")
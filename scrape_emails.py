@@ -1,8 +1,8 @@
-import openpyxl
+from xlsx_reader import iter_xlsx_columns
 import xlrd  # For handling .xls files
 import csv
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
 import re
 import tkinter as tk
 from tkinter import filedialog, scrolledtext
@@ -43,39 +43,56 @@ def search_google(query):
         print(f"Failed to retrieve Google search results. Status code: {response.status_code}")
         return None
 
+EMAIL_REGEX = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Every div under #rso in document order, compiled once
+RSO_DIVS = etree.XPath("//*[@id='rso']//div")
+FIRST_LINK = etree.XPath("(.//a[@href])[1]")
+
+# Visible text the same way BeautifulSoup's get_text() sees it (no comments, scripts or styles)
+TEXT_XPATH = etree.XPath("descendant::text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+HTML_PARSER = etree.HTMLParser(encoding="utf-8")
+
 def extract_emails_and_links(html_content):
-    soup = BeautifulSoup(html_content, 'lxml')
+    if not html_content or not html_content.strip():
+        return '', ''
+    root = etree.fromstring(html_content.encode("utf-8"), HTML_PARSER)
+    if root is None:
+        return '', ''
+    
+    # Find the first div at each position 1-10 among its sibling divs in one pass,
+    # these are the divs '#rso div:nth-of-type(1..10)' select
+    first_at_position = {}
+    sibling_counts = {}
+    for div in RSO_DIVS(root):
+        parent = div.getparent()
+        position = sibling_counts.get(parent, 0) + 1
+        sibling_counts[parent] = position
+        if position <= 10 and position not in first_at_position:
+            first_at_position[position] = div
     
-    div_ids = [f"rso div:nth-of-type({i})" for i in range(1, 11)]
-    email_regex = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
     email = ''
     link = ''
     
-    for div_id in div_ids:
-        div = soup.select_one(f'#{div_id}')
-        if div:
-            email_match = re.search(email_regex, div.get_text())
+    for position in range(1, 11):
+        div = first_at_position.get(position)
+        if div is not None:
+            email_match = EMAIL_REGEX.search("".join(TEXT_XPATH(div)))
             if email_match:
                 email = email_match.group(0)
                 
-                link_tag = div.find('a', href=True)
-                if link_tag:
-                    link = link_tag['href']
+                link_tags = FIRST_LINK(div)
+                if link_tags:
+                    link = link_tags[0].get('href')
     
     return email, link
 
 # Function to handle xlsx files
 def handle_xlsx(file_path, start_index, end_index):
-    wb = openpyxl.load_workbook(file_path)
-    sheet = wb.active
-
     data_list = []
-    for i, r in enumerate(sheet.iter_rows()):
-        if start_index <= i < end_index:
-            if r[0].value and len(r[0].value) > 1:
-                data_list.append({"name": r[0].value, "number": r[4].value})
-        if i >= end_index:
-            break
+    for i, (name, number) in iter_xlsx_columns(file_path, [0, 4], start_index, end_index):
+        if name and len(name) > 1:
+            data_list.append({"name": name, "number": number})
     return data_list
 
 # Function to handle xls files
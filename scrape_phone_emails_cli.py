@@ -1,488 +1,523 @@
-import openpyxl
 import xlrd  # For handling .xls files
+from xlsx_reader import iter_xlsx_columns
+from serp_archive import SerpArchive, normalize_query
 import csv
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from lxml import etree
 import re
 import sys
 from datetime import datetime
 import os
 import random
-from urllib.parse import quote_plus
+import time
+from urllib.parse import quote_plus, urlsplit
 import argparse
+import glob
+import heapq
+import tempfile
+import io
+import gzip
+import queue
+import json
+from array import array
+import sqlite3
+import zlib
+import threading
+import multiprocessing
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-# Function to perform search with multiple engines
-def search_realtor_info(query, search_engine="duckduckgo"):
+# Default headers shared by every search engine session
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# One pooled keep-alive session per search engine, created on first use
+engine_sessions = {}
+session_pool_size = 10
+sessions_lock = threading.Lock()
+
+def configure_sessions(pool_size=10):
     """
-    Search for realtor information using different search engines
+    Set the connection pool size for search engine sessions
+    Existing sessions are closed and rebuilt on their next use
     """
-    
-    if search_engine == "duckduckgo":
-        return search_duckduckgo(query)
-    elif search_engine == "bing":
-        return search_bing(query)
-    elif search_engine == "google":
-        return search_google(query)
-    elif search_engine == "yahoo":
-        return search_yahoo(query)
-    elif search_engine == "ask":
-        return search_ask(query)
-    elif search_engine == "yandex":
-        return search_yandex(query)
-    elif search_engine == "ecosia":
-        return search_ecosia(query)
-    elif search_engine == "startpage":
-        return search_startpage(query)
-    elif search_engine == "searx":
-        return search_searx(query)
-    else:
-        return None
+    global session_pool_size
+    with sessions_lock:
+        session_pool_size = max(1, int(pool_size))
+        for session in engine_sessions.values():
+            session.close()
+        engine_sessions.clear()
 
-def search_duckduckgo(query):
-    """Search using DuckDuckGo (more bot-friendly)"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        # DuckDuckGo search URL
-        search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"DuckDuckGo search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"DuckDuckGo search error: {e}")
-        return None
+def get_session(search_engine):
+    """Return the pooled session for a search engine, reusing its open connections"""
+    with sessions_lock:
+        session = engine_sessions.get(search_engine)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=session_pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            engine_sessions[search_engine] = session
+        return session
 
-def search_bing(query):
-    """Search using Bing"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        # Bing search URL
-        search_url = f"https://www.bing.com/search?q={quote_plus(query)}"
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"Bing search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"Bing search error: {e}")
-        return None
+EMAIL_REGEX = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
 
-def search_google(query):
-    """Search using Google with enhanced anti-detection"""
-    try:
-        # Rotate between different user agents
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
-        ]
-        
-        headers = {
-            "User-Agent": random.choice(user_agents),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
+# Visible text the same way BeautifulSoup's get_text() sees it (no comments, scripts or styles)
+TEXT_XPATH = etree.XPath("descendant::text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+HTML_PARSER = etree.HTMLParser(encoding="utf-8")
+
+# Function to get an element's visible text
+def element_text(element):
+    return "".join(TEXT_XPATH(element))
+
+# Function to build an XPath matching elements with one class in their class list, like BeautifulSoup's class_=
+def xpath_with_class(tag, name):
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+
+FIRST_LINK_XPATH = "(.//a[@href])[1]"
+
+class EngineSpec:
+    """
+    Everything needed to query one search engine and read its results
+    Selectors are compiled once here, so tuning an engine never touches the search loop
+    """
+    def __init__(self, name, label, url_template, result_xpath, link_xpath=FIRST_LINK_XPATH,
+                 headers=None, user_agents=None, timeout=10, block_markers=(), rate=0.5, burst=2):
+        self.name = name
+        self.label = label
+        self.url_template = url_template
+        self.default_url_template = url_template
+        self.result_selector = etree.XPath(result_xpath)
+        self.link_selector = etree.XPath(link_xpath)
+        self.headers = headers or {}
+        self.user_agents = user_agents
+        self.timeout = timeout
+        self.block_markers = tuple(block_markers)
+        self.rate = rate
+        self.burst = burst
+
+    def search_url(self, query):
+        return self.url_template.format(query=quote_plus(query))
+
+    def request_headers(self):
+        """Per-request headers sent on top of the session defaults"""
+        if not self.user_agents:
+            return self.headers
+        return {**self.headers, "User-Agent": random.choice(self.user_agents)}
+
+    def is_blocked(self, html):
+        return any(marker in html for marker in self.block_markers)
+
+# Registry of supported search engines
+ENGINES = {spec.name: spec for spec in [
+    EngineSpec(
+        "duckduckgo", "DuckDuckGo",  # More bot-friendly
+        "https://html.duckduckgo.com/html/?q={query}",
+        xpath_with_class("div", "result"),
+        "(.//a[contains(concat(' ', normalize-space(@class), ' '), ' result__a ')])[1]",
+        block_markers=["anomaly-modal"],
+        rate=1.0, burst=3,
+    ),
+    EngineSpec(
+        "bing", "Bing",
+        "https://www.bing.com/search?q={query}",
+        xpath_with_class("li", "b_algo"),
+        "(.//h2)[1]/descendant::a[1]",
+        rate=1.0, burst=3,
+    ),
+    EngineSpec(
+        "google", "Google",  # Most likely to block, rotate user agents
+        "https://www.google.com/search?q={query}&num=10",
+        xpath_with_class("div", "g"),
+        headers={
             "Sec-Fetch-Dest": "document",
             "Sec-Fetch-Mode": "navigate",
             "Sec-Fetch-Site": "none",
             "Cache-Control": "max-age=0",
-        }
-        
-        # Google search URL with additional parameters
-        search_url = f"https://www.google.com/search?q={quote_plus(query)}&num=10"
-        
-        response = requests.get(search_url, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            # Check if we got a challenge page
-            if "Please click here if you are not redirected" in response.text:
-                print("Google detected bot traffic, trying alternative search engine...")
-                return None
-            return response.text
-        else:
-            print(f"Google search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"Google search error: {e}")
-        return None
+        },
+        user_agents=[
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
+        ],
+        timeout=15,
+        block_markers=["Please click here if you are not redirected"],
+        rate=0.2, burst=1,
+    ),
+    EngineSpec(
+        "yahoo", "Yahoo",
+        "https://search.yahoo.com/search?p={query}",
+        xpath_with_class("div", "Sr"),
+        rate=1.0, burst=3,
+    ),
+    EngineSpec(
+        "ask", "Ask",
+        "https://www.ask.com/web?q={query}",
+        xpath_with_class("div", "PartialSearchResults-item"),
+    ),
+    EngineSpec(
+        "yandex", "Yandex",
+        "https://yandex.com/search/?text={query}",
+        xpath_with_class("li", "serp-item"),
+        rate=0.3, burst=1,
+    ),
+    EngineSpec(
+        "ecosia", "Ecosia",
+        "https://www.ecosia.org/search?q={query}",
+        xpath_with_class("article", "result"),
+    ),
+    EngineSpec(
+        "startpage", "Startpage",  # Google proxy
+        "https://www.startpage.com/sp/search?query={query}",
+        xpath_with_class("div", "w-gl__result"),
+    ),
+    EngineSpec(
+        "searx", "Searx",  # Using a public Searx instance
+        "https://searx.be/search?q={query}",
+        xpath_with_class("div", "result"),
+    ),
+]}
 
-def search_yahoo(query):
-    """Search using Yahoo"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        search_url = f"https://search.yahoo.com/search?p={quote_plus(query)}"
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"Yahoo search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"Yahoo search error: {e}")
-        return None
+# Function to point search engines at another server, such as a local stand-in for benchmarks
+def set_engine_base_url(base_url=None, engines=None):
+    """
+    Keeps each engine's path and query string and swaps the scheme and host for
+    base_url/<engine>, so one server can tell the engines apart
+    With no base_url the engines go back to their real addresses
+    """
+    for name in engines or ENGINES:
+        spec = ENGINES[name]
+        if not base_url:
+            spec.url_template = spec.default_url_template
+            continue
+        parts = urlsplit(spec.default_url_template)
+        spec.url_template = f"{base_url.rstrip('/')}/{name}{parts.path}" + (f"?{parts.query}" if parts.query else "")
 
-def search_ask(query):
-    """Search using Ask.com"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        search_url = f"https://www.ask.com/web?q={quote_plus(query)}"
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"Ask search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"Ask search error: {e}")
-        return None
+# Default request budget per search engine: (requests per second, burst size)
+ENGINE_RATE_LIMITS = {name: (spec.rate, spec.burst) for name, spec in ENGINES.items()}
 
-def search_yandex(query):
-    """Search using Yandex"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        search_url = f"https://yandex.com/search/?text={quote_plus(query)}"
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"Yandex search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"Yandex search error: {e}")
-        return None
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst` tokens"""
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
 
-def search_ecosia(query):
-    """Search using Ecosia"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1 - self.tokens) / self.rate
+
+class EngineScheduler:
+    """
+    Hands out requests to search engines within each engine's own rate budget
+    A row asks for any of its remaining engines and gets the first one in
+    preference order that has capacity, so a throttled engine never holds up the others
+    """
+    def __init__(self, limits=None):
+        limits = limits or ENGINE_RATE_LIMITS
+        # An engine that never gets a token would block acquire() forever
+        for engine, (rate, burst) in limits.items():
+            if rate <= 0 or burst < 1:
+                raise ValueError(f"Rate limit for {engine} must have a rate above 0 and a burst of at least 1")
+        self.buckets = {
+            engine: TokenBucket(rate, burst)
+            for engine, (rate, burst) in limits.items()
         }
-        
-        search_url = f"https://www.ecosia.org/search?q={quote_plus(query)}"
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"Ecosia search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"Ecosia search error: {e}")
-        return None
+        self.lock = threading.Lock()
+
+    def acquire(self, engines):
+        """Block until one of `engines` has capacity and return it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = float("inf")
+                for engine in engines:
+                    bucket = self.buckets.get(engine)
+                    if bucket is None or bucket.try_take(now):
+                        return engine
+                    wait = min(wait, bucket.wait_time(now))
+            time.sleep(min(wait, 1.0))
+
+def parse_rate_limits(specs):
+    """
+    Parse ENGINE=RATE[:BURST] strings into a rate limit table
+    Starts from ENGINE_RATE_LIMITS so only the given engines are overridden,
+    an engine given without BURST keeps its default burst
+    """
+    limits = dict(ENGINE_RATE_LIMITS)
+    for spec in specs or []:
+        engine, _, value = spec.partition("=")
+        engine = engine.strip()
+        rate, _, burst = value.partition(":")
+        if not engine or not rate:
+            raise ValueError(f"Invalid rate limit '{spec}', expected ENGINE=RATE[:BURST]")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown search engine '{engine}' in rate limit '{spec}', expected one of: {', '.join(ENGINES)}")
+        try:
+            rate = float(rate)
+            burst = int(burst) if burst else limits[engine][1]
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{spec}', expected ENGINE=RATE[:BURST]")
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid rate limit '{spec}', RATE must be above 0 and BURST at least 1")
+        limits[engine] = (rate, burst)
+    return limits
 
-def search_startpage(query):
-    """Search using Startpage (Google proxy)"""
+# Function to perform search with multiple engines
+def search_realtor_info(query, search_engine="duckduckgo"):
+    """
+    Search for realtor information using different search engines
+    Returns the result page HTML, or None when the search failed or was blocked
+    """
+    spec = ENGINES.get(search_engine)
+    if spec is None:
+        return None
+    
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        search_url = f"https://www.startpage.com/sp/search?query={quote_plus(query)}"
-        response = requests.get(search_url, headers=headers, timeout=10)
+        response = get_session(spec.name).get(spec.search_url(query), headers=spec.request_headers(), timeout=spec.timeout)
         
         if response.status_code == 200:
+            # Check if we got a challenge page
+            if spec.is_blocked(response.text):
+                print(f"{spec.label} detected bot traffic, trying alternative search engine...")
+                return None
             return response.text
         else:
-            print(f"Startpage search failed with status code: {response.status_code}")
+            print(f"{spec.label} search failed with status code: {response.status_code}")
             return None
             
     except Exception as e:
-        print(f"Startpage search error: {e}")
+        print(f"{spec.label} search error: {e}")
         return None
 
-def search_searx(query):
-    """Search using Searx (privacy-focused)"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        # Using a public Searx instance
-        search_url = f"https://searx.be/search?q={quote_plus(query)}"
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"Searx search failed with status code: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"Searx search error: {e}")
+# Function to parse a result page, returns the root element or None for an empty page
+def parse_results_page(html_content):
+    if not html_content or not html_content.strip():
         return None
+    return etree.fromstring(html_content.encode("utf-8"), HTML_PARSER)
 
-def extract_emails_and_links(html_content, search_engine="duckduckgo"):
-    """
-    Extract emails and links from search results
-    Works with different search engines
-    """
-    if not html_content:
-        return '', ''
-        
-    soup = BeautifulSoup(html_content, 'html.parser')
-    email_regex = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+# Function to find the first email and its link in a parsed result page
+def extract_from_tree(root, search_engine="duckduckgo"):
     email = ''
     link = ''
     
-    if search_engine == "duckduckgo":
-        # DuckDuckGo specific selectors
-        results = soup.find_all('div', class_='result')
-        for result in results[:5]:  # Check first 5 results
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                # Find the main link in this result
-                link_elem = result.find('a', class_='result__a')
-                if link_elem and link_elem.get('href'):
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "bing":
-        # Bing specific selectors
-        results = soup.find_all('li', class_='b_algo')
-        for result in results[:5]:  # Check first 5 results
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                # Find the main link in this result
-                link_elem = result.find('h2').find('a') if result.find('h2') else None
-                if link_elem and link_elem.get('href'):
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "google":
-        # Google specific selectors (fallback)
-        results = soup.find_all('div', class_='g')
-        for result in results[:5]:  # Check first 5 results
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
+    spec = ENGINES.get(search_engine)
+    if spec:
+        for result in spec.result_selector(root)[:5]:  # Check first 5 results
+            email_match = EMAIL_REGEX.search(element_text(result))
             if email_match:
                 email = email_match.group(0)
                 # Find the main link in this result
-                link_elem = result.find('a', href=True)
-                if link_elem:
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "yahoo":
-        # Yahoo specific selectors
-        results = soup.find_all('div', class_='Sr')
-        for result in results[:5]:
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                link_elem = result.find('a', href=True)
-                if link_elem:
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "ask":
-        # Ask.com specific selectors
-        results = soup.find_all('div', class_='PartialSearchResults-item')
-        for result in results[:5]:
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                link_elem = result.find('a', href=True)
-                if link_elem:
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "yandex":
-        # Yandex specific selectors
-        results = soup.find_all('li', class_='serp-item')
-        for result in results[:5]:
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                link_elem = result.find('a', href=True)
-                if link_elem:
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "ecosia":
-        # Ecosia specific selectors
-        results = soup.find_all('article', class_='result')
-        for result in results[:5]:
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                link_elem = result.find('a', href=True)
-                if link_elem:
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "startpage":
-        # Startpage specific selectors
-        results = soup.find_all('div', class_='w-gl__result')
-        for result in results[:5]:
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                link_elem = result.find('a', href=True)
-                if link_elem:
-                    link = link_elem['href']
-                break
-                
-    elif search_engine == "searx":
-        # Searx specific selectors
-        results = soup.find_all('div', class_='result')
-        for result in results[:5]:
-            text = result.get_text()
-            email_match = re.search(email_regex, text)
-            if email_match:
-                email = email_match.group(0)
-                link_elem = result.find('a', href=True)
-                if link_elem:
-                    link = link_elem['href']
+                link_elems = spec.link_selector(result)
+                if link_elems:
+                    link = link_elems[0].get('href') or ''
                 break
     
     # If no email found in structured results, search entire page
     if not email:
-        page_text = soup.get_text()
-        email_match = re.search(email_regex, page_text)
+        email_match = EMAIL_REGEX.search(element_text(root))
         if email_match:
             email = email_match.group(0)
     
     return email, link
 
-# Function to handle xlsx files for phone data format (First Name, Last Name, Phone)
+def extract_emails_and_links(html_content, search_engine="duckduckgo"):
+    """
+    Extract emails and links from search results
+    Works with different search engines, parsing once with lxml and the
+    engine's precompiled selectors
+    """
+    root = parse_results_page(html_content)
+    if root is None:
+        return '', ''
+    return extract_from_tree(root, search_engine)
+
+# Mailboxes that belong to an office rather than to one agent
+GENERIC_MAILBOXES = {
+    "info", "contact", "admin", "office", "support", "sales", "hello", "team", "mail", "email",
+    "noreply", "no-reply", "help", "enquiries", "inquiries", "marketing", "webmaster", "listings",
+}
+
+# Domains seen in page templates and examples, never an agent's real address
+PLACEHOLDER_DOMAINS = {"example.com", "domain.com", "email.com", "yourdomain.com", "sentry.io", "wixpress.com"}
+
+# A domain run into the page text that followed it, like agent@compass.comHAR.comwww.har.com
+GLUED_DOMAIN_REGEX = re.compile(r"\.(?:com|net|org|edu|gov|biz|info|us)(?:[A-Z]|www)")
+
+# Page text kept on each side of an email found outside the results, for scoring
+CONTEXT_CHARS = 150
+
+# Function to list every email on a result page with where it was found
+def iter_candidates(root, search_engine="duckduckgo", max_results=10):
+    """
+    Yield (email, link, nearby text) for each distinct email, the engine's results
+    first and then the rest of the page
+    The page-wide text is only built if the caller keeps asking for candidates
+    """
+    seen = set()
+    spec = ENGINES.get(search_engine)
+    if spec:
+        for result in spec.result_selector(root)[:max_results]:
+            text = element_text(result)
+            link = None
+            for match in EMAIL_REGEX.finditer(text):
+                email = match.group(0)
+                if email.lower() in seen:
+                    continue
+                seen.add(email.lower())
+                if link is None:
+                    link_elems = spec.link_selector(result)
+                    link = (link_elems[0].get('href') or '') if link_elems else ''
+                yield email, link, text
+    
+    text = element_text(root)
+    for match in EMAIL_REGEX.finditer(text):
+        email = match.group(0)
+        if email.lower() in seen:
+            continue
+        seen.add(email.lower())
+        yield email, '', text[max(0, match.start() - CONTEXT_CHARS):match.end() + CONTEXT_CHARS]
+
+# Function to keep only the letters of a name or mailbox
+def letters_only(text):
+    return re.sub(r"[^a-z]", "", str(text).casefold())
+
+# Function to score how likely an email belongs to the row's agent
+def score_candidate(email, context, target):
+    """
+    target is (first name, last name, phone key), the score runs from 0 to 1
+    The agent's names in the mailbox count most, then their phone number and
+    last name in the text around the email
+    Office mailboxes like info@ lose points, placeholder and glued domains score 0
+    """
+    first_name, last_name, phone = target
+    mailbox, _, domain = email.lower().partition("@")
+    if domain in PLACEHOLDER_DOMAINS or GLUED_DOMAIN_REGEX.search(email.partition("@")[2]):
+        return 0.0
+    
+    mailbox_letters = letters_only(mailbox)
+    first = letters_only(first_name)
+    last = letters_only(last_name)
+    score = 0.0
+    if len(first) >= 3 and first in mailbox_letters:
+        score += 0.4
+    elif first and len(last) >= 3 and mailbox_letters.startswith(first[0] + last):
+        # Initial and last name, like jsmith
+        score += 0.3
+    if len(last) >= 3 and last in mailbox_letters:
+        score += 0.4
+    elif len(last) >= 3 and last in letters_only(domain):
+        score += 0.2
+    if mailbox in GENERIC_MAILBOXES:
+        score -= 0.2
+    
+    if len(last) >= 3 and str(last_name).casefold() in context.casefold():
+        score += 0.1
+    digits = NON_DIGITS.sub("", phone or "")[-7:]
+    if len(digits) == 7 and digits in NON_DIGITS.sub("", context):
+        score += 0.3
+    return round(max(0.0, min(1.0, score)), 2)
+
+# Function to pick the best scored email on a parsed result page
+def best_candidate(root, search_engine, target, confidence=0.7):
+    """
+    Returns (email, link, score), stopping at the first email scoring confidence
+    or more so a confident answer in the results skips the page-wide scan
+    """
+    best = ('', '', 0.0)
+    for email, link, context in iter_candidates(root, search_engine):
+        score = score_candidate(email, context, target)
+        if not best[0] or score > best[2]:
+            best = (email, link, score)
+        if score >= confidence:
+            break
+    return best
+
+# Function to parse a result page and score its emails, runs in the parse pool too
+def score_page(html_content, search_engine, target, confidence=0.7):
+    root = parse_results_page(html_content)
+    if root is None:
+        return '', '', 0.0
+    return best_candidate(root, search_engine, target, confidence)
+
+# A row's search query, "Email for realtor <first> <last>, <phone>", which names the scoring target
+QUERY_TARGET_REGEX = re.compile(r"realtor\s+(\S+)\s+(.+?),\s*([\d()+.\s-]+)", re.IGNORECASE)
+
+# Function to recover the scoring target (first name, last name, phone key) from a search query
+def query_target(query):
+    match = QUERY_TARGET_REGEX.search(query or "")
+    if match is None:
+        return None
+    first_name, last_name, phone = match.groups()
+    return first_name, last_name, phone_key(phone)
+
+# Function to stream rows from xlsx files for phone data format (First Name, Last Name, Phone)
 def handle_xlsx(file_path, start_index, end_index=None):
     print(f"Loading Excel file '{file_path}'...")
-    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
-    sheet = wb.active
-    print(f"Excel file loaded. Starting to process rows...")
 
-    data_list = []
+    records = 0
     rows_processed = 0
-    for i, r in enumerate(sheet.iter_rows()):
-        if i < start_index:
-            continue
-        if end_index and i >= end_index:
-            break
-        
+    # Only the first three columns are read, straight from the sheet XML
+    for i, (first_value, last_value, phone_value) in iter_xlsx_columns(file_path, [0, 1, 2], start_index, end_index):
         rows_processed += 1
         if rows_processed % 100 == 0:
             print(f"  Processed {rows_processed} rows from Excel file...")
         
         # Check if we have valid data in the first three columns
-        if r[0].value and r[1].value and r[2].value:
-            first_name = str(r[0].value).strip()
-            last_name = str(r[1].value).strip()
-            phone = str(r[2].value).strip()
+        if first_value and last_value and phone_value:
+            first_name = str(first_value).strip()
+            last_name = str(last_value).strip()
+            phone = str(phone_value).strip()
             
             # Skip header row or empty rows
             if first_name.lower() not in ['first name', 'firstname', ''] and len(first_name) > 1:
-                data_list.append({
+                records += 1
+                yield {
                     "first_name": first_name,
                     "last_name": last_name,
                     "phone": phone,
-                    "full_name": f"{first_name} {last_name}"
-                })
+                    "full_name": f"{first_name} {last_name}",
+                    "row_index": i
+                }
     
-    wb.close()
-    print(f"Finished loading {len(data_list)} valid records from Excel file.")
-    return data_list
+    print(f"Finished loading {records} valid records from Excel file.")
 
-# Function to handle xls files for phone data format
+# Function to stream rows from xls files for phone data format
 def handle_xls(file_path, start_index, end_index=None):
     print(f"Loading XLS file '{file_path}'...")
     wb = xlrd.open_workbook(file_path)
     sheet = wb.sheet_by_index(0)
     print(f"XLS file loaded. Starting to process rows...")
 
-    data_list = []
+    records = 0
     max_rows = sheet.nrows if not end_index else min(end_index, sheet.nrows)
     
     for i in range(start_index, max_rows):
@@ -497,24 +532,85 @@ def handle_xls(file_path, start_index, end_index=None):
             
             # Skip header row or empty rows
             if first_name.lower() not in ['first name', 'firstname', ''] and len(first_name) > 1:
-                data_list.append({
+                records += 1
+                yield {
                     "first_name": first_name,
                     "last_name": last_name,
                     "phone": phone,
-                    "full_name": f"{first_name} {last_name}"
-                })
+                    "full_name": f"{first_name} {last_name}",
+                    "row_index": i
+                }
+    
+    print(f"Finished loading {records} valid records from XLS file.")
+
+# Rows between entries in a CSV offset index
+CSV_INDEX_STRIDE = 1000
+
+# Function to record the byte offset of every CSV_INDEX_STRIDE-th row
+def build_csv_index(file_path, stride=CSV_INDEX_STRIDE):
+    """
+    Scan the file once in binary, counting quotes so newlines inside quoted
+    fields don't start a new row, the same way csv.reader splits records
+    """
+    offsets = array('Q')
+    offset = 0
+    row = 0
+    in_quotes = False
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if not in_quotes and row % stride == 0:
+                offsets.append(offset)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            offset += len(line)
+            if not in_quotes:
+                row += 1
+    return offsets
+
+# Function to load the sidecar offset index, rebuilding it when the CSV changed
+def load_csv_index(file_path, stride=CSV_INDEX_STRIDE):
+    """
+    The sidecar '<file>.idx' starts with the CSV's size, mtime and the stride,
+    followed by the row offsets, all as unsigned 64-bit integers
+    """
+    index_path = file_path + ".idx"
+    stat = os.stat(file_path)
+    header = [stat.st_size, stat.st_mtime_ns, stride]
     
-    print(f"Finished loading {len(data_list)} valid records from XLS file.")
-    return data_list
+    if os.path.exists(index_path):
+        stored = array('Q')
+        with open(index_path, 'rb') as f:
+            stored.frombytes(f.read())
+        if list(stored[:3]) == header:
+            return stored[3:]
+    
+    print(f"Building row offset index '{index_path}'...")
+    offsets = build_csv_index(file_path, stride)
+    with open(index_path, 'wb') as f:
+        array('Q', header).tofile(f)
+        offsets.tofile(f)
+    return offsets
 
-# Function to handle csv files for phone data format
-def handle_csv(file_path, start_index, end_index=None):
+# Function to stream rows from csv files for phone data format
+def handle_csv(file_path, start_index, end_index=None, use_index=False):
     print(f"Loading CSV file '{file_path}'...")
-    data_list = []
+    records = 0
     rows_processed = 0
+    
+    # Jump to the indexed row at or before start_index instead of parsing every row before it
+    first_row = 0
+    first_offset = 0
+    if use_index and start_index > 0:
+        offsets = load_csv_index(file_path)
+        slot = min(start_index // CSV_INDEX_STRIDE, len(offsets) - 1)
+        if slot > 0:
+            first_row = slot * CSV_INDEX_STRIDE
+            first_offset = offsets[slot]
+    
     with open(file_path, newline='', encoding='utf-8') as csvfile:
+        csvfile.seek(first_offset)
         csvreader = csv.reader(csvfile)
-        for i, row in enumerate(csvreader):
+        for i, row in enumerate(csvreader, first_row):
             if i < start_index:
                 continue
             if end_index and i >= end_index:
@@ -531,18 +627,1362 @@ def handle_csv(file_path, start_index, end_index=None):
                 
                 # Skip header row or empty rows
                 if first_name.lower() not in ['first name', 'firstname', ''] and len(first_name) > 1:
-                    data_list.append({
+                    records += 1
+                    yield {
                         "first_name": first_name,
                         "last_name": last_name,
                         "phone": phone,
-                        "full_name": f"{first_name} {last_name}"
-                    })
+                        "full_name": f"{first_name} {last_name}",
+                        "row_index": i
+                    }
+    
+    print(f"Finished loading {records} valid records from CSV file.")
+
+# Input readers by file extension, each is a generator so searching starts on the first row
+INPUT_READERS = {
+    ".xlsx": handle_xlsx,
+    ".xls": handle_xls,
+    ".csv": handle_csv,
+}
+
+class ResultCache:
+    """
+    On-disk SQLite cache of search results keyed by normalized query and engine
+    Found emails and "no email found" outcomes expire after their own TTLs
+    Concurrent lookups of the same key share one in-flight request
+    """
+    def __init__(self, path, ttl=30 * 86400, negative_ttl=3 * 86400):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "query TEXT NOT NULL, engine TEXT NOT NULL, email TEXT NOT NULL, link TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, score REAL, PRIMARY KEY (query, engine))"
+        )
+        # Caches from before scoring have no score column, their entries read back unscored
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(results)")]
+        if "score" not in columns:
+            self.conn.execute("ALTER TABLE results ADD COLUMN score REAL")
+        self.conn.commit()
+        self.db_lock = threading.Lock()
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query, engine):
+        """Return (email, link, score) if a fresh entry exists, otherwise None, score is None for unscored entries"""
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT email, link, stored_at, score FROM results WHERE query = ? AND engine = ?",
+                (normalize_query(query), engine)
+            ).fetchone()
+        if row is None:
+            return None
+        email, link, stored_at, score = row
+        ttl = self.ttl if email else self.negative_ttl
+        if time.time() - stored_at > ttl:
+            return None
+        return email, link, score
+
+    def put(self, query, engine, email, link, score=None):
+        with self.db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (query, engine, email, link, stored_at, score) VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_query(query), engine, email or '', link or '', time.time(), score)
+            )
+            self.conn.commit()
+
+    def lookup(self, query, engine, fetch):
+        """
+        Return (email, link, score, message) from the cache, or call fetch(query, engine)
+        fetch returns (email, link, score, message, completed) and only completed
+        searches are stored, so network failures are retried next time
+        """
+        key = (normalize_query(query), engine)
+        while True:
+            cached = self.get(query, engine)
+            if cached is not None:
+                with self.in_flight_lock:
+                    self.hits += 1
+                email, link, score = cached
+                if email:
+                    return email, link, score, f"    ✓ Found email: {email} (via {engine}, cached)"
+                return '', '', 0.0, f"    - No email found in {engine} results (cached)"
+            
+            with self.in_flight_lock:
+                event = self.in_flight.get(key)
+                if event is None:
+                    event = self.in_flight[key] = threading.Event()
+                    break
+            # Another row is already searching this key, wait for its answer
+            event.wait()
+            if self.get(query, engine) is None:
+                # The other search failed, so do our own
+                with self.in_flight_lock:
+                    if key not in self.in_flight:
+                        self.in_flight[key] = event = threading.Event()
+                        break
+        
+        with self.in_flight_lock:
+            self.misses += 1
+        try:
+            email, link, score, message, completed = fetch(query, engine)
+            if completed:
+                self.put(query, engine, email, link, score)
+            return email, link, score, message
+        finally:
+            with self.in_flight_lock:
+                self.in_flight.pop(key, None)
+            event.set()
+
+    def close(self):
+        with self.db_lock:
+            self.conn.close()
+
+# Anything that isn't a digit, stripped from phone numbers
+NON_DIGITS = re.compile(r"\D")
+
+# Function to turn a phone number into an E.164 style key like +15124220941
+@lru_cache(maxsize=65536)
+def phone_key(phone):
+    """
+    15124220941, (512) 422-0941, +1 512-422-0941 and the float 5124220941.0 all
+    map to the same key, bare ten digit numbers are taken as North American
+    Memoized since large inputs repeat the same numbers many times
+    """
+    phone = str(phone).strip()
+    # xlrd hands back numeric cells as floats like 3255132765.0
+    if phone.endswith(".0"):
+        phone = phone[:-2]
+    digits = NON_DIGITS.sub("", phone)
+    if not digits:
+        return ""
+    if len(digits) == 10 and not phone.startswith("+"):
+        return "+1" + digits
+    return "+" + digits
+
+# Function to case-fold a name and collapse its whitespace
+def name_key(*parts):
+    return " ".join(" ".join(str(part) for part in parts).casefold().split())
+
+# Function to build the key that identifies a person in the input and output files
+def row_key(first_name, last_name, phone):
+    return (name_key(first_name, last_name), phone_key(phone))
+
+# Function to write a phone key the way listings print it, for search queries
+def query_phone(key):
+    if len(key) == 12 and key.startswith("+1"):
+        return f"({key[2:5]}) {key[5:8]}-{key[8:]}"
+    return key
+
+# Function to attach canonical keys to streamed rows, a batch at a time
+def normalize_rows(rows, batch_size=1000):
+    """
+    Every later stage (sharding, resume, dedupe, the caches and the query) reads
+    data["key"], data["name_key"] and data["phone_key"] instead of re-parsing
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        phone_keys = [phone_key(data["phone"]) for data in batch]
+        name_keys = [name_key(data["first_name"], data["last_name"]) for data in batch]
+        for data, phone, name in zip(batch, phone_keys, name_keys):
+            data["phone_key"] = phone
+            data["name_key"] = name
+            data["key"] = (name, phone)
+        yield from batch
+
+# Output columns, as CSV headers and as field names for JSON Lines and Parquet
+OUTPUT_HEADERS = ["First Name", "Last Name", "Phone", "Full Name", "Email", "Source Link"]
+OUTPUT_FIELDS = ["first_name", "last_name", "phone", "full_name", "email", "source_link"]
+
+# Function to pick the output format from an explicit choice or the file extension
+def output_format_for(output_file, output_format=None):
+    if output_format:
+        return output_format
+    extension = os.path.splitext(output_file)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".parquet":
+        return "parquet"
+    return "csv"
+
+# Function to cut off a partial last line left by a crash mid-write
+def repair_partial_line(path, is_complete=None, line_end=b"\n"):
+    """
+    A last line without its newline is kept, and line_end added, when
+    is_complete(line) says it holds a whole record, otherwise it is cut off
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            chunk = f.read(end - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        f.seek(end)
+        if is_complete is not None and is_complete(f.read(size - end)):
+            f.seek(size)
+            f.write(line_end)
+            print(f"Added the missing newline after the last line of {path}")
+            return
+        f.truncate(end)
+    print(f"Removed a partial line left in {path} by an interrupted run")
+
+class ResultWriter:
+    """
+    Buffers result rows and commits them in batches, once batch_size rows
+    are waiting or batch_seconds have passed since the last commit
+    """
+    def __init__(self, path, batch_size=100, batch_seconds=2.0):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.batch_seconds = batch_seconds
+        self.batch = []
+        self.last_commit = time.monotonic()
+
+    def write(self, values):
+        self.batch.append(values)
+        if len(self.batch) >= self.batch_size:
+            self.commit()
+
+    def commit_if_due(self):
+        if self.batch and time.monotonic() - self.last_commit >= self.batch_seconds:
+            self.commit()
+
+    def commit(self):
+        if self.batch:
+            self.write_batch(self.batch)
+            self.batch = []
+        self.last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+
+    @classmethod
+    def repair(cls, path):
+        """Fix up what an interrupted run left in the output, before it is read or appended to"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class AppendFileWriter(ResultWriter):
+    """
+    Appends each batch with a single write on an O_APPEND descriptor followed by fsync
+    A crash can only cut the last line short, and that partial line is removed on the next open
+    unless it still parses as a whole record, which only gets its missing newline
+    """
+    line_end = b"\n"
+
+    def __init__(self, path, batch_size=100, batch_seconds=2.0):
+        super().__init__(path, batch_size, batch_seconds)
+        self.repair(path)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        # Write headers only if file doesn't exist
+        if is_new:
+            self.write_bytes(self.header())
+
+    def header(self):
+        return b""
+
+    def encode(self, batch):
+        raise NotImplementedError
+
+    @staticmethod
+    def is_complete_line(line):
+        """Whether a last line missing its newline still holds a whole record"""
+        return False
+
+    @classmethod
+    def repair(cls, path):
+        repair_partial_line(path, cls.is_complete_line, cls.line_end)
+
+    def write_bytes(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+        os.fsync(self.fd)
+
+    def write_batch(self, batch):
+        self.write_bytes(self.encode(batch))
+
+    def close(self):
+        super().close()
+        os.close(self.fd)
+
+class CsvResultWriter(AppendFileWriter):
+    line_end = b"\r\n"
+
+    def header(self):
+        return self.encode([OUTPUT_HEADERS])
+
+    def encode(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        return buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def is_complete_line(line):
+        try:
+            rows = list(csv.reader([line.decode("utf-8")], strict=True))
+        except (UnicodeDecodeError, csv.Error):
+            return False
+        return len(rows) == 1 and len(rows[0]) == len(OUTPUT_HEADERS)
+
+class JsonlResultWriter(AppendFileWriter):
+    def encode(self, batch):
+        return "".join(
+            json.dumps(dict(zip(OUTPUT_FIELDS, values)), ensure_ascii=False) + "\n"
+            for values in batch
+        ).encode("utf-8")
+
+    @staticmethod
+    def is_complete_line(line):
+        try:
+            return isinstance(json.loads(line.decode("utf-8")), dict)
+        except ValueError:
+            return False
+
+class ParquetResultWriter(ResultWriter):
+    """
+    Writes each batch as its own part file in a dataset directory
+    Parts are written under a temporary name and renamed into place, so a crash
+    never leaves a truncated part behind
+    The small parts of frequent commits are merged every compact_parts parts and
+    on close, into one part-<first>-<last> file that replaces parts first to last
+    """
+    def __init__(self, path, batch_size=100, batch_seconds=2.0, compact_parts=100):
+        super().__init__(path, batch_size, batch_seconds)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow, install it with: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.compact_parts = max(2, int(compact_parts))
+        os.makedirs(path, exist_ok=True)
+        self.part = max((last for _, last, _ in list_parquet_parts(path)), default=0)
+        self.loose = []
+
+    def write_batch(self, batch):
+        columns = list(zip(*batch))
+        table = self.pa.table({field: list(column) for field, column in zip(OUTPUT_FIELDS, columns)})
+        self.part += 1
+        part_path = os.path.join(self.path, f"part-{self.part:06d}.parquet")
+        temp_path = part_path + ".tmp"
+        self.pq.write_table(table, temp_path)
+        os.replace(temp_path, part_path)
+        self.loose.append(part_path)
+        if len(self.loose) >= self.compact_parts:
+            self.compact()
+
+    def compact(self, row_group_rows=65536):
+        """Merge the parts written since the last compaction into one file"""
+        if len(self.loose) < 2:
+            self.loose = []
+            return
+        first = int(PARQUET_PART_REGEX.fullmatch(os.path.basename(self.loose[0])).group(1))
+        merged_path = os.path.join(self.path, f"part-{first:06d}-{self.part:06d}.parquet")
+        temp_path = merged_path + ".tmp"
+        writer = None
+        tables = []
+        rows = 0
+        for part_path in self.loose + [None]:
+            if part_path is not None:
+                table = self.pq.read_table(part_path)
+                tables.append(table)
+                rows += table.num_rows
+            if tables and (rows >= row_group_rows or part_path is None):
+                table = self.pa.concat_tables(tables)
+                if writer is None:
+                    writer = self.pq.ParquetWriter(temp_path, table.schema)
+                writer.write_table(table)
+                tables = []
+                rows = 0
+        writer.close()
+        # Once the merged part is in place it hides the small ones, so a crash here leaves no duplicates
+        os.replace(temp_path, merged_path)
+        for part_path in self.loose:
+            os.remove(part_path)
+        self.loose = []
+
+    def close(self):
+        super().close()
+        self.compact()
+
+# Committed part files are part-<n>.parquet, or part-<first>-<last>.parquet once merged
+PARQUET_PART_REGEX = re.compile(r"part-(\d+)(?:-(\d+))?\.parquet")
+
+# Function to list the committed parts of a Parquet output directory as (first, last, path)
+def list_parquet_parts(path):
+    """Parts already merged into a larger one, left behind by a crash, are skipped"""
+    parts = []
+    for name in os.listdir(path):
+        match = PARQUET_PART_REGEX.fullmatch(name)
+        if match:
+            first = int(match.group(1))
+            parts.append((first, int(match.group(2) or first), os.path.join(path, name)))
+    merged = [(first, last) for first, last, _ in parts if last > first]
+    return sorted(
+        (first, last, part_path) for first, last, part_path in parts
+        if not any(start <= first and last <= end and (start, end) != (first, last) for start, end in merged)
+    )
+
+# Function to list the committed part files of a Parquet output directory
+def parquet_parts(path):
+    return [part_path for _, _, part_path in list_parquet_parts(path)]
+
+RESULT_WRITERS = {
+    "csv": CsvResultWriter,
+    "jsonl": JsonlResultWriter,
+    "parquet": ParquetResultWriter,
+}
+
+# Function to read result rows back from any output format
+def iter_output_rows(output_file, output_format=None):
+    """Yields each written result as a list of the six output columns"""
+    output_format = output_format_for(output_file, output_format)
+    if not os.path.exists(output_file):
+        return
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        for part in parquet_parts(output_file):
+            table = pq.read_table(part, columns=OUTPUT_FIELDS).to_pydict()
+            yield from (list(values) for values in zip(*(table[field] for field in OUTPUT_FIELDS)))
+    elif output_format == "jsonl":
+        with open(output_file, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    yield [record.get(field, '') for field in OUTPUT_FIELDS]
+    else:
+        with open(output_file, newline='', encoding='utf-8') as file:
+            for row in csv.reader(file):
+                if len(row) >= 3 and row[:3] != OUTPUT_HEADERS[:3]:
+                    yield row[:6] + [''] * (6 - len(row))
+
+# Function to parse a shard spec like "2/8" into (shard number, shard count)
+def parse_shard(spec):
+    shard, _, count = str(spec).partition("/")
+    try:
+        shard, count = int(shard), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected K/N like 1/4")
+    if count < 1 or not 1 <= shard <= count:
+        raise ValueError(f"Invalid shard '{spec}', K must be between 1 and N")
+    return shard, count
+
+# Function to keep only the rows that belong to one shard
+def shard_rows(rows, shard, count, mode="hash"):
+    """
+    hash: rows go by a stable hash of the row key, so repeats of a person share a shard
+    stride: rows go round robin by their row number in the input file
+    Every worker running the same spec on the same input picks the same rows
+    """
+    for data in rows:
+        if mode == "stride":
+            bucket = data["row_index"] % count
+        else:
+            key = "\x1f".join(data["key"])
+            bucket = zlib.crc32(key.encode("utf-8")) % count
+        if bucket == shard - 1:
+            yield data
+
+# Function to merge per-shard output files back into input order
+def merge_shard_outputs(file_path, shard_files, output_file, start_index=1, end_index=None):
+    """
+    Walks the input file in order and writes, for each row, the next unused result
+    for that person from the shard outputs
+    Input rows no shard has processed yet are left out, and results that match
+    no input row are appended at the end
+    """
+    results = {}
+    for shard_file in shard_files:
+        for row in iter_output_rows(shard_file):
+            # Match on the exact values written, so each phone formatting variant keeps its own row
+            results.setdefault(tuple(row[:3]), deque()).append(row)
+    
+    file_extension = os.path.splitext(file_path)[1].lower()
+    reader = INPUT_READERS.get(file_extension)
+    if reader is None:
+        print(f"Unsupported file type: {file_extension}")
+        return
+    
+    written = 0
+    missing = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(OUTPUT_HEADERS)
+        for data in reader(file_path, start_index, end_index):
+            matches = results.get((data["first_name"], data["last_name"], data["phone"]))
+            if matches:
+                writer.writerow(matches.popleft())
+                written += 1
+            else:
+                missing += 1
+        
+        leftover = 0
+        for matches in results.values():
+            for row in matches:
+                writer.writerow(row)
+                leftover += 1
+    
+    print(f"Merged {written} rows from {len(shard_files)} shard files into {output_file}")
+    if missing:
+        print(f"  {missing} input rows had no result in any shard yet")
+    if leftover:
+        print(f"  {leftover} results matched no input row and were appended at the end")
+
+# Function to date a result file, by the timestamp in its name or else its modification time
+def result_file_time(path):
+    match = re.search(r"(\d{8}_\d{6})", os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+    return os.path.getmtime(path)
+
+# Function to read any result file as phone-format rows
+def iter_result_file(path):
+    """
+    Handles the CLI/GUI output (First Name, Last Name, Phone, ...) in every output
+    format, and the older realtor output (name, number, email, page)
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline='', encoding='utf-8', errors='replace') as file:
+            header = next(csv.reader(file), [])
+        if [h.strip().lower() for h in header[:2]] == ["name", "number"]:
+            with open(path, newline='', encoding='utf-8', errors='replace') as file:
+                reader = csv.reader(file)
+                next(reader, None)
+                for row in reader:
+                    if row and row[0].strip():
+                        row = row + [''] * (4 - len(row))
+                        first_name, _, last_name = row[0].strip().partition(" ")
+                        yield [first_name, last_name, row[1], row[0].strip(), row[2], row[3]]
+            return
+    yield from iter_output_rows(path)
+
+# Function to collect result files from a mix of files and directories
+def find_result_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path) and not path.lower().endswith(".parquet"):
+            for pattern in ("*.csv", "*.jsonl", "*.ndjson", "*.parquet"):
+                files.extend(glob.glob(os.path.join(path, pattern)))
+        else:
+            files.append(path)
+    return files
+
+# Function to merge every historical result file into one deduplicated master file
+def consolidate_results(paths, output_file, chunk_rows=200000):
+    """
+    External merge sort on (normalized full name, normalized phone): rows are sorted
+    in chunks of chunk_rows, spilled to temporary files and merged with heapq.merge,
+    so memory stays bounded whatever the total size
+    Each person keeps the newest non-empty email, newer files and later lines winning
+    """
+    files = sorted(find_result_files(paths), key=result_file_time)
+    print(f"Consolidating {len(files)} result files...")
+    
+    def sort_key(record):
+        return (record[0], record[1], int(record[2]), int(record[3]))
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        chunk_paths = []
+        chunk = []
+        
+        def spill():
+            chunk.sort(key=sort_key)
+            chunk_path = os.path.join(temp_dir, f"chunk-{len(chunk_paths):05d}.csv")
+            with open(chunk_path, 'w', newline='', encoding='utf-8') as file:
+                csv.writer(file).writerows(chunk)
+            chunk_paths.append(chunk_path)
+            chunk.clear()
+        
+        rows_read = 0
+        for file_rank, path in enumerate(files):
+            for line, row in enumerate(iter_result_file(path)):
+                first_name, last_name, phone, full_name, email, link = row
+                name = name_key(full_name) if full_name else name_key(first_name, last_name)
+                chunk.append([name, phone_key(phone), file_rank, line, first_name, last_name, phone, full_name, email, link])
+                rows_read += 1
+                if len(chunk) >= chunk_rows:
+                    spill()
+        if chunk:
+            spill()
+        
+        def read_chunk(chunk_path):
+            with open(chunk_path, newline='', encoding='utf-8') as file:
+                yield from csv.reader(file)
+        
+        people = 0
+        with_email = 0
+        with open(output_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(OUTPUT_HEADERS)
+            
+            def write_person(newest, newest_with_email):
+                best = newest_with_email or newest
+                writer.writerow(newest[4:8] + best[8:10])
+            
+            current_key = None
+            newest = newest_with_email = None
+            for record in heapq.merge(*(read_chunk(path) for path in chunk_paths), key=sort_key):
+                key = (record[0], record[1])
+                if key != current_key:
+                    if current_key is not None:
+                        write_person(newest, newest_with_email)
+                        people += 1
+                        with_email += bool(newest_with_email)
+                    current_key = key
+                    newest_with_email = None
+                # Records arrive oldest first within a person
+                newest = record
+                if record[8].strip():
+                    newest_with_email = record
+            if current_key is not None:
+                write_person(newest, newest_with_email)
+                people += 1
+                with_email += bool(newest_with_email)
     
-    print(f"Finished loading {len(data_list)} valid records from CSV file.")
-    return data_list
+    print(f"Read {rows_read} rows, wrote {people} people ({with_email} with an email) to {output_file}")
+
+class KnownAnswers:
+    """
+    SQLite store of every email found so far, indexed on normalized phone and on name
+    Rows whose phone and name already have a confident answer are answered without any search
+    New answers are buffered and written in batches from the thread that owns the run
+    """
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "phone TEXT NOT NULL, name TEXT NOT NULL, email TEXT NOT NULL, link TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, score REAL, PRIMARY KEY (phone, name)) WITHOUT ROWID"
+        )
+        # Stores from before scoring have no score column, their answers are scored again when read
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(answers)")]
+        if "score" not in columns:
+            self.conn.execute("ALTER TABLE answers ADD COLUMN score REAL")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS answers_name ON answers (name)")
+        self.conn.commit()
+        self.buffer = []
+        self.hits = 0
+        self.added = 0
+
+    def get(self, key):
+        """Return (email, link, score) if the person with this row key was resolved before, otherwise None"""
+        name, phone = key
+        return self.conn.execute(
+            "SELECT email, link, score FROM answers WHERE phone = ? AND name = ?",
+            (phone, name)
+        ).fetchone()
+
+    def answer(self, data, confidence=0.7):
+        """
+        Return (email, link) for a row when its stored answer scores confidence or more, otherwise None
+        Answers stored without a score are scored against the row first
+        """
+        answer = self.get(data["key"])
+        if answer is None:
+            return None
+        email, link, score = answer
+        if score is None:
+            score = score_candidate(email, "", (data["first_name"], data["last_name"], data["phone_key"]))
+        if score < confidence:
+            return None
+        self.hits += 1
+        return email, link
+
+    def add(self, key, email, link, score=None, stored_at=None):
+        if not email:
+            return
+        name, phone = key
+        self.buffer.append((phone, name, email, link or '', stored_at or time.time(), score))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO answers (phone, name, email, link, stored_at, score) VALUES (?, ?, ?, ?, ?, ?)",
+                    self.buffer
+                )
+            self.added += len(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+# Function to load historical result files into the known answers store
+def import_known_answers(paths, store_file, min_score=0.3):
+    """
+    Files are loaded oldest first so the newest email for a person wins
+    Emails are scored against their row, and ones below min_score, like
+    addresses glued to the page text, are left out
+    """
+    files = sorted(find_result_files(paths), key=result_file_time)
+    store = KnownAnswers(store_file, batch_size=10000)
+    rows_read = 0
+    rejected = 0
+    for path in files:
+        stored_at = result_file_time(path)
+        for first_name, last_name, phone, _, email, link in iter_result_file(path):
+            rows_read += 1
+            email = email.strip()
+            if not email:
+                continue
+            score = score_candidate(email, "", (first_name, last_name, phone_key(phone)))
+            if score < min_score:
+                rejected += 1
+                continue
+            store.add(row_key(first_name, last_name, phone), email, link, score, stored_at)
+    store.close()
+    count = sqlite3.connect(store_file).execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+    print(f"Imported {store.added} answers from {rows_read} rows in {len(files)} files"
+          f" ({rejected} scoring below {min_score:.2f} left out), {store_file} now holds {count} people")
+
+# Function to index rows already written to the output file
+def load_processed_keys(output_file, output_format=None):
+    """
+    Stream the output once and count how many times each row key was written
+    Counting keeps repeated input rows correct, each written row covers one occurrence
+    """
+    processed = Counter()
+    for row in iter_output_rows(output_file, output_format):
+        processed[row_key(row[0], row[1], row[2])] += 1
+    return processed
+
+# Function to drop rows that a previous run already wrote
+def skip_processed_rows(rows, processed, stats):
+    for data in rows:
+        key = data["key"]
+        if processed[key] > 0:
+            processed[key] -= 1
+            stats["skipped"] += 1
+        else:
+            yield data
+
+class DebugCapture:
+    """
+    Keeps a sample of search result pages for fixing broken selectors
+    Pages where no email was found are always kept when on_failure is set, others
+    with probability sample_rate. Pages are gzipped and written by a background
+    thread into a ring of at most max_files files and max_bytes bytes, the oldest
+    files being removed first. When the writer falls behind, pages are dropped
+    rather than slowing the search
+    """
+    def __init__(self, directory="debug_pages", sample_rate=0.01, on_failure=True,
+                 max_files=200, max_bytes=50 * 1024 * 1024, queue_size=64):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.on_failure = on_failure
+        self.max_files = max(1, int(max_files))
+        self.max_bytes = max_bytes
+        self.captured = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        
+        # Pick up the ring left by earlier runs, oldest first
+        self.files = deque()
+        self.total_bytes = 0
+        self.sequence = 0
+        for name in sorted(os.listdir(directory)):
+            # Only our own numbered captures, other pages saved here are left alone
+            sequence = name.split("-", 1)[0]
+            if name.endswith(".html.gz") and re.fullmatch(r"[0-9]+", sequence):
+                path = os.path.join(directory, name)
+                size = os.path.getsize(path)
+                self.files.append((path, size))
+                self.total_bytes += size
+                self.sequence = max(self.sequence, int(sequence) + 1)
+        
+        self.pages = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def capture(self, html, search_engine, found):
+        """Queue a page if it is sampled, never blocks"""
+        if not html or not ((self.on_failure and not found) or random.random() < self.sample_rate):
+            return
+        try:
+            self.pages.put_nowait((html, search_engine, found))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            page = self.pages.get()
+            if page is None:
+                return
+            html, search_engine, found = page
+            try:
+                self.write(html, search_engine, found)
+            except OSError as e:
+                print(f"Could not save debug page: {e}")
+
+    def write(self, html, search_engine, found):
+        name = f"{self.sequence:08d}-{search_engine}-{'found' if found else 'missed'}.html.gz"
+        self.sequence += 1
+        path = os.path.join(self.directory, name)
+        data = gzip.compress(html.encode("utf-8"), compresslevel=6)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        self.files.append((path, len(data)))
+        self.total_bytes += len(data)
+        self.captured += 1
+        
+        while len(self.files) > self.max_files or (self.total_bytes > self.max_bytes and len(self.files) > 1):
+            old_path, old_size = self.files.popleft()
+            self.total_bytes -= old_size
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Write out the pages still queued and stop the writer thread"""
+        self.pages.put(None)
+        self.thread.join()
+
+# Function to tell which engine a saved page came from, by its folder or file name
+def saved_page_engine(path, default_engine):
+    """
+    Debug captures are named like 00000012-yahoo-missed.html.gz, and folders
+    named after an engine tag every page inside them
+    """
+    tokens = re.split(r"[^a-z]+", path.lower().replace(os.sep, "-"))
+    for token in reversed(tokens):
+        if token in ENGINES:
+            return token
+    return default_engine
+
+# Function to list the saved pages under the given files and folders
+def find_saved_pages(paths):
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                pages.extend(os.path.join(folder, name) for name in names
+                             if name.endswith((".html", ".htm", ".html.gz")))
+        else:
+            pages.append(path)
+    return sorted(pages)
+
+# Function to score the emails on a page saved without its row, returns (email, link, score)
+def score_saved_page(html_content, search_engine, query=None, confidence=0.7, min_score=0.3):
+    """
+    The target is read from the query, or else from the page title, which repeats
+    the query on every engine. Pages with neither are ranked without a target
+    Emails scoring below min_score are dropped, as in a live run
+    """
+    root = parse_results_page(html_content)
+    if root is None:
+        return '', '', 0.0
+    if query is None:
+        query = " ".join(root.xpath("//title//text()"))
+    target = query_target(query) or ("", "", "")
+    email, link, score = best_candidate(root, search_engine, target, confidence)
+    if score < min_score and target != ("", "", ""):
+        return '', '', score
+    return email, link, score
+
+# Function to extract one batch of saved page files, run in a worker process
+def extract_saved_pages(pages, confidence=0.7, min_score=0.3):
+    results = []
+    for path, engine in pages:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        start = time.perf_counter()
+        email, link, score = score_saved_page(html, engine, None, confidence, min_score)
+        results.append((path, engine, email, link, score, time.perf_counter() - start))
+    return results
+
+# Function to extract one batch of archived pages, run in a worker process
+def extract_archived_pages(archive_file, entries, confidence=0.7, min_score=0.3):
+    archive = SerpArchive(archive_file, read_only=True)
+    results = []
+    for query, engine, fetched_at, offset, length in entries:
+        html = archive.read(offset, length)
+        start = time.perf_counter()
+        email, link, score = score_saved_page(html, engine, query, confidence, min_score)
+        results.append((f"{query} @ {fetched_at:.3f}", engine, email, link, score, time.perf_counter() - start))
+    archive.close()
+    return results
+
+# Function to pick how worker processes are started
+def worker_context():
+    """
+    Forking a process that already runs threads can copy a lock some other thread
+    holds, leaving the worker stuck on it, so workers come from a forkserver, or
+    are spawned where there is none
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+# Function to run one (function, *args) batch in a worker process
+def run_batch(batch):
+    function, *args = batch
+    return function(*args)
+
+# Function to rerun extraction over saved pages or an archive, without any network
+def extract_offline(paths, default_engine="yahoo", workers=None, results_file=None,
+                    compare_file=None, show_diffs=20, batch_size=32, confidence=0.7, min_score=0.3):
+    """
+    Pages are extracted in batches across worker processes, their emails scored
+    against the row named in the query as in a live run
+    Reports emails found and time per page, optionally writes the results to a CSV
+    and lists the pages whose result differs from an earlier results CSV
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = []
+    if len(paths) == 1 and os.path.isfile(paths[0]) and os.path.exists(paths[0] + ".db"):
+        archive = SerpArchive(paths[0], read_only=True)
+        entries = archive.entries()
+        archive.close()
+        for i in range(0, len(entries), batch_size):
+            batches.append((extract_archived_pages, paths[0], entries[i:i + batch_size], confidence, min_score))
+        print(f"Extracting {len(entries)} archived pages with {workers} workers...")
+    else:
+        pages = [(path, saved_page_engine(path, default_engine)) for path in find_saved_pages(paths)]
+        for i in range(0, len(pages), batch_size):
+            batches.append((extract_saved_pages, pages[i:i + batch_size], confidence, min_score))
+        print(f"Extracting {len(pages)} saved pages with {workers} workers...")
+    
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=worker_context()) as pool:
+        for batch_results in pool.map(run_batch, batches):
+            results.extend(batch_results)
+    elapsed = time.perf_counter() - start
+    
+    if not results:
+        print("No pages found")
+        return
+    
+    times = sorted(result[5] for result in results)
+    found = sum(1 for result in results if result[2])
+    print(f"Extracted {len(results)} pages in {elapsed:.2f}s ({len(results) / elapsed:.0f} pages/s)")
+    confident = sum(1 for result in results if result[2] and result[4] >= confidence)
+    print(f"Emails found: {found}/{len(results)} ({found / len(results):.0%}), {confident} scoring {confidence:.2f} or more")
+    print(f"Time per page: mean {sum(times) / len(times) * 1000:.2f} ms, "
+          f"p50 {times[len(times) // 2] * 1000:.2f} ms, p95 {times[int(len(times) * 0.95)] * 1000:.2f} ms, "
+          f"max {times[-1] * 1000:.2f} ms")
+    
+    by_engine = Counter(result[1] for result in results)
+    found_by_engine = Counter(result[1] for result in results if result[2])
+    for engine, count in sorted(by_engine.items()):
+        print(f"  {engine}: {found_by_engine[engine]}/{count} with an email")
+    
+    if results_file:
+        with open(results_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Page", "Engine", "Email", "Source Link", "Score", "Seconds"])
+            for page, engine, email, link, score, seconds in results:
+                writer.writerow([page, engine, email, link, f"{score:.2f}", f"{seconds:.6f}"])
+        print(f"Results written to {results_file}")
+    
+    if compare_file:
+        with open(compare_file, newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            previous = {row[0]: row[2] for row in reader if len(row) >= 3}
+        
+        changed = []
+        new_pages = 0
+        for page, engine, email, _, _, _ in results:
+            before = previous.pop(page, None)
+            if before is None:
+                new_pages += 1
+            elif before != email:
+                changed.append((page, engine, before, email))
+        gained = sum(1 for _, _, before, after in changed if after and not before)
+        lost = sum(1 for _, _, before, after in changed if before and not after)
+        print(f"Compared with {compare_file}: {len(changed)} pages changed "
+              f"({gained} gained an email, {lost} lost one, {len(changed) - gained - lost} changed it)")
+        if new_pages:
+            print(f"  {new_pages} pages were not in {compare_file}")
+        if previous:
+            print(f"  {len(previous)} pages from {compare_file} were not extracted this time")
+        for page, engine, before, after in changed[:show_diffs]:
+            print(f"  [{engine}] {page}: {before or '-'} -> {after or '-'}")
+        if len(changed) > show_diffs:
+            print(f"  ... and {len(changed) - show_diffs} more")
+
+# Lock so concurrent rows don't interleave their log lines
+print_lock = threading.Lock()
+
+class EngineBandit:
+    """
+    Adaptive engine order by Thompson sampling
+    Each engine keeps counts of confident hits and misses per request, halved every
+    half_life seconds, and a moving average of its response time. For every row a
+    hit rate is drawn from each engine's Beta posterior and engines are tried by
+    drawn hits per second of cost, so the best engines are used most while the
+    others are still sampled now and then. An engine that starts blocking us drops
+    back quickly, and one that stopped gets retried as its old misses fade
+    The statistics are saved at the end of a run and reloaded as priors, scaled
+    down to prior_weight requests so fresh results soon outweigh them
+    """
+    def __init__(self, engines, path=None, half_life=3600, request_cost=0.5, prior_weight=50):
+        self.path = path
+        self.half_life = half_life
+        self.request_cost = request_cost
+        self.lock = threading.Lock()
+        self.updated = time.time()
+        # The static preference order is the starting prior, earlier engines get a head start
+        self.stats = {
+            engine: {"hits": (len(engines) - rank) / len(engines), "misses": 0.0, "latency": 1.0, "requests": 0}
+            for rank, engine in enumerate(engines)
+        }
+        
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            fade = 0.5 ** (max(0.0, self.updated - saved.get("saved_at", self.updated)) / half_life)
+            for engine, stats in saved.get("engines", {}).items():
+                if engine not in self.stats:
+                    continue
+                weight = stats["hits"] + stats["misses"]
+                scale = (min(1.0, prior_weight / weight) if weight else 1.0) * fade
+                self.stats[engine].update(hits=stats["hits"] * scale, misses=stats["misses"] * scale,
+                                          latency=stats["latency"])
+
+    def age(self):
+        """Fade every engine's counts by the time since the last update, call with the lock held"""
+        now = time.time()
+        fade = 0.5 ** ((now - self.updated) / self.half_life)
+        self.updated = now
+        for stats in self.stats.values():
+            stats["hits"] *= fade
+            stats["misses"] *= fade
+
+    def order(self, engines):
+        """Return engines in the order this row should try them"""
+        with self.lock:
+            self.age()
+            draws = {
+                engine: random.betavariate(1 + self.stats[engine]["hits"], 1 + self.stats[engine]["misses"])
+                / (self.stats[engine]["latency"] + self.request_cost)
+                for engine in engines
+            }
+        return sorted(engines, key=draws.get, reverse=True)
+
+    def record(self, engine, hit, seconds):
+        """Count one request, hit meaning it gave a confident email"""
+        with self.lock:
+            self.age()
+            stats = self.stats[engine]
+            stats["hits"] += 1 if hit else 0
+            stats["misses"] += 0 if hit else 1
+            stats["latency"] += 0.2 * (seconds - stats["latency"])
+            stats["requests"] += 1
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            self.age()
+            saved = {
+                "saved_at": self.updated,
+                "engines": {engine: {key: stats[key] for key in ("hits", "misses", "latency")}
+                            for engine, stats in self.stats.items()},
+            }
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+    def summary(self):
+        with self.lock:
+            return [
+                f"  {engine}: {stats['requests']} requests this run, "
+                f"hit rate {(1 + stats['hits']) / (2 + stats['hits'] + stats['misses']):.0%}, "
+                f"{stats['latency']:.2f}s per request"
+                for engine, stats in self.stats.items()
+            ]
+
+class LookupContext:
+    """Settings shared by every row lookup in a run"""
+    def __init__(self, search_engines_order, buffer_output=False, scheduler=None,
+                 hedge_k=1, hedge_delay=None, hedge_executor=None, cache=None, parse_pool=None,
+                 debug_capture=None, archive=None, confidence=0.7, min_score=0.3, bandit=None):
+        self.search_engines_order = search_engines_order
+        self.cache = cache
+        self.parse_pool = parse_pool
+        self.debug_capture = debug_capture
+        self.archive = archive
+        self.confidence = confidence
+        self.min_score = min_score
+        self.bandit = bandit
+        self.buffer_output = buffer_output
+        self.scheduler = scheduler
+        self.hedge_k = max(1, int(hedge_k))
+        self.hedge_delay = hedge_delay
+        self.hedge_executor = hedge_executor
+
+    @property
+    def hedged(self):
+        return self.hedge_executor is not None and (self.hedge_k > 1 or self.hedge_delay is not None)
+
+    def engine_order(self):
+        """Engines for one row to try, in learned order when adaptive ordering is on"""
+        if self.bandit:
+            return self.bandit.order(self.search_engines_order)
+        return list(self.search_engines_order)
+
+    def next_engine(self, remaining_engines):
+        """Pick the next engine to ask, waiting for rate budget when a scheduler is set"""
+        if self.scheduler:
+            return self.scheduler.acquire(remaining_engines)
+        return remaining_engines[0]
+
+# Function to search one engine and extract the result
+def fetch_engine(query, search_engine, parse_pool=None, debug_capture=None, archive=None,
+                 target=None, confidence=0.7):
+    """
+    Returns (email, link, score, log message, whether the engine returned a page)
+    With a target (first name, last name, phone key) every email on the page is
+    scored against it and the best one returned, without one the first email
+    found is returned with a score of 1
+    With a parse pool the HTML is parsed in a worker process, so this thread
+    releases the GIL and other rows keep fetching while the page is parsed
+    """
+    try:
+        search_results_html = search_realtor_info(query, search_engine)
+        
+        if search_results_html:
+            if archive is not None:
+                archive.add(query, search_engine, search_results_html)
+            if target is not None:
+                args = (score_page, search_results_html, search_engine, target, confidence)
+            else:
+                args = (extract_emails_and_links, search_results_html, search_engine)
+            if parse_pool is not None:
+                result = parse_pool.submit(*args).result()
+            else:
+                result = args[0](*args[1:])
+            email, link = result[:2]
+            score = result[2] if target is not None else (1.0 if email else 0.0)
+            if debug_capture is not None:
+                debug_capture.capture(search_results_html, search_engine, bool(email))
+            if email:
+                scored = f", score {score:.2f}" if target is not None else ""
+                return email, link, score, f"    ✓ Found email: {email} (via {search_engine}{scored})", True
+            return '', '', 0.0, f"    - No email found in {search_engine} results", True
+        return '', '', 0.0, f"    - {search_engine} search failed", False
+        
+    except Exception as e:
+        return '', '', 0.0, f"    - Error with {search_engine}: {e}", False
+
+# Function to search one engine, going through the result cache when there is one
+def try_engine(query, search_engine, context, target=None):
+    """Returns (email, link, score, log message) for one search engine attempt"""
+    def fetch(query, search_engine):
+        start = time.perf_counter()
+        result = fetch_engine(query, search_engine, context.parse_pool, context.debug_capture, context.archive,
+                              target, context.confidence)
+        # Only real requests teach the engine order, cache hits say nothing about the engine
+        if context.bandit:
+            email, _, score = result[:3]
+            context.bandit.record(search_engine, bool(email) and score >= context.confidence,
+                                  time.perf_counter() - start)
+        return result
+    
+    if context.cache is None:
+        return fetch(query, search_engine)[:4]
+    email, link, score, message = context.cache.lookup(query, search_engine, fetch)
+    if score is None:
+        # Cached before scoring, judge the email on its own
+        score = score_candidate(email, "", target) if target is not None and email else float(bool(email))
+    return email, link, score, message
+
+# Function to try search engines one after another until one finds an email
+def search_sequential(query, context, log, target=None):
+    """
+    Stops at the first email scoring context.confidence or more, otherwise keeps
+    the best email seen across all engines
+    Returns (email, link, score, engines_tried)
+    """
+    engines_tried = 0
+    best = ('', '', 0.0)
+    remaining_engines = context.engine_order()
+    while remaining_engines:
+        search_engine = context.next_engine(remaining_engines)
+        remaining_engines.remove(search_engine)
+        engines_tried += 1
+        log(f"  Trying search engine {engines_tried}/{len(context.search_engines_order)}: {search_engine}")
+        
+        email, link, score, message = try_engine(query, search_engine, context, target)
+        log(message)
+        if email and (not best[0] or score > best[2]):
+            best = (email, link, score)
+        if email and score >= context.confidence:
+            break
+    
+    return best + (engines_tried,)
+
+# Function to race several search engines for the same query
+def search_hedged(query, context, log, target=None):
+    """
+    Keep hedge_k engines in flight, adding the next engine whenever one misses
+    or hedge_delay seconds pass without an answer
+    The first email scoring context.confidence or more wins, attempts that have not
+    started yet are cancelled and the ones already running are left to finish in the background
+    Returns (email, link, score, engines_tried)
+    """
+    engines_tried = 0
+    best = ('', '', 0.0)
+    remaining_engines = context.engine_order()
+    in_flight = {}
+    
+    def launch():
+        nonlocal engines_tried
+        search_engine = context.next_engine(remaining_engines)
+        remaining_engines.remove(search_engine)
+        engines_tried += 1
+        log(f"  Trying search engine {engines_tried}/{len(context.search_engines_order)}: {search_engine}")
+        in_flight[context.hedge_executor.submit(try_engine, query, search_engine, context, target)] = search_engine
+    
+    for _ in range(min(context.hedge_k, len(remaining_engines))):
+        launch()
+    
+    while in_flight:
+        timeout = context.hedge_delay if remaining_engines else None
+        done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            in_flight.pop(future)
+            email, link, score, message = future.result()
+            log(message)
+            if email and (not best[0] or score > best[2]):
+                best = (email, link, score)
+            if email and score >= context.confidence:
+                for other in in_flight:
+                    other.cancel()
+                return best + (engines_tried,)
+        
+        # Every miss frees a slot, and an expired hedge delay adds one
+        for _ in range(len(done) or 1):
+            if remaining_engines:
+                launch()
+    
+    return best + (engines_tried,)
+
+# Function to look up a single row
+def process_row(data, idx, total, context):
+    """
+    Search for one row's email, returns (email, link, score)
+    When context.buffer_output is set the log lines are printed together once the row finishes
+    """
+    lines = []
+    
+    def log(message):
+        if context.buffer_output:
+            lines.append(message)
+        else:
+            print(message)
+    
+    first_name = data["first_name"]
+    last_name = data["last_name"]
+    phone_number = data["phone"]
+    full_name = data["full_name"]
+    
+    # Use one optimized query per search engine, with the phone in its canonical form
+    query = f"Email for realtor {first_name} {last_name}, {query_phone(data['phone_key']) or phone_number}"
+    
+    progress = f"{idx}/{total}" if total else f"{idx}"
+    log(f"[{progress}] Searching for: {full_name} - {phone_number}")
+    
+    # Emails are scored against the row, so an office address doesn't end the search
+    target = (first_name, last_name, data["phone_key"])
+    if context.hedged:
+        email, link, score, engines_tried = search_hedged(query, context, log, target)
+    else:
+        email, link, score, engines_tried = search_sequential(query, context, log, target)
+    
+    if email and score < context.min_score:
+        log(f"  ✗ Best email {email} scored {score:.2f}, below {context.min_score:.2f}, not kept")
+        email, link, score = '', '', 0.0
+    elif email and score < context.confidence:
+        log(f"  ~ Keeping low confidence email {email} (score {score:.2f})")
+    
+    if not email:
+        log(f"  ✗ No email found for {full_name} after trying {engines_tried} search engines")
+    
+    if context.buffer_output:
+        with print_lock:
+            print("\n".join(lines))
+    
+    return email, link, score
+
+class OrderedResults:
+    """
+    Hands finished rows to write() in the order they were read
+    Every row takes a turn when it is read, and rows finishing ahead of an
+    earlier turn are held until that one is written
+    """
+    def __init__(self, write):
+        self.write = write
+        self.held = {}
+        self.taken = 0
+        self.written = 0
+
+    def take_turn(self):
+        self.taken += 1
+        return self.taken
+
+    def waiting(self):
+        """Rows read but not yet written, the oldest of them is always still being looked up"""
+        return self.taken - self.written
+
+    def finish(self, turn, *result):
+        self.held[turn] = result
+        while self.written + 1 in self.held:
+            self.written += 1
+            self.write(*self.held.pop(self.written))
+
+# Finished lookups kept in memory to answer duplicate rows
+FINISHED_RESULTS = 100000
 
 # Function to run the scraper
-def run_scraper(file_path, start_index, end_index=None, primary_engine="duckduckgo", output_file="phone_email_output_server.csv"):
+def run_scraper(file_path, start_index, end_index=None, primary_engine="duckduckgo", output_file="phone_email_output_server.csv",
+                concurrency=1, pool_size=10, rate_limits=None, hedge_k=1, hedge_delay=None,
+                cache_file=None, cache_ttl_days=30, negative_ttl_days=3, resume=False, dedupe=True,
+                parse_workers=0, queue_size=None, csv_index=False, shard=None, shard_mode="hash",
+                output_format=None, batch_size=100, batch_seconds=2.0, known_answers_file=None,
+                debug_dir=None, debug_sample=0.01, archive_file=None, confidence=0.7, min_score=0.3,
+                adaptive=False, engine_stats_file="engine_stats.json"):
     try:
         print("Phone Email Scraper started...")
         print(f"Input file: {file_path}")
@@ -556,18 +1996,35 @@ def run_scraper(file_path, start_index, end_index=None, primary_engine="duckduck
 
         file_extension = os.path.splitext(file_path)[1].lower()
 
-        # Load data based on file type
-        if file_extension == ".xlsx":
-            data_list = handle_xlsx(file_path, start_index, end_index)
-        elif file_extension == ".xls":
-            data_list = handle_xls(file_path, start_index, end_index)
-        elif file_extension == ".csv":
-            data_list = handle_csv(file_path, start_index, end_index)
-        else:
+        output_format = output_format_for(output_file, output_format)
+        
+        # Stream rows based on file type
+        reader = INPUT_READERS.get(file_extension)
+        if reader is None:
             print(f"Unsupported file type: {file_extension}")
             return
-
-        print(f"Loaded {len(data_list)} records to process")
+        if file_extension == ".csv":
+            rows = handle_csv(file_path, start_index, end_index, use_index=csv_index)
+        else:
+            rows = reader(file_path, start_index, end_index)
+        
+        # Canonical phone and name keys, computed once per row for every later stage
+        rows = normalize_rows(rows)
+        
+        # Keep only this worker's share of the rows
+        if shard:
+            shard_number, shard_count = shard
+            print(f"Processing shard {shard_number}/{shard_count} (by {shard_mode})")
+            rows = shard_rows(rows, shard_number, shard_count, shard_mode)
+        
+        # Skip rows a previous run already wrote to the output file
+        stats = Counter()
+        if resume:
+            # A record cut short by the crash is removed first, so its row is searched again
+            RESULT_WRITERS[output_format].repair(output_file)
+            processed = load_processed_keys(output_file, output_format)
+            print(f"Resuming: {sum(processed.values())} rows already in {output_file} will be skipped")
+            rows = skip_processed_rows(rows, processed, stats)
 
         # Define search engines in order of preference (most reliable first)
         search_engines_order = [
@@ -583,76 +2040,201 @@ def run_scraper(file_path, start_index, end_index=None, primary_engine="duckduck
             search_engines_order.remove(primary_engine)
             search_engines_order.insert(0, primary_engine)
         
-        # Check if output file exists to determine if we need to write headers
-        file_exists = os.path.exists(output_file)
+        concurrency = max(1, int(concurrency))
+        queue_size = max(concurrency, int(queue_size or concurrency * 4))
+        hedging = int(hedge_k) > 1 or hedge_delay is not None
         
-        # Open CSV file in append mode
-        with open(output_file, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
+        # Every thread that can be fetching from one engine at once needs its own pooled
+        # connection, otherwise the extra connections are opened and thrown away per request
+        search_threads = concurrency * len(search_engines_order) if hedging else concurrency
+        configure_sessions(max(pool_size, search_threads))
+        
+        # Pace requests per engine unless rate limiting was turned off
+        scheduler = EngineScheduler(rate_limits) if rate_limits is not False else None
+        if concurrency > 1:
+            print(f"Running with {concurrency} concurrent lookups")
+        
+        # Hedged attempts run on their own pool so rows never wait on each other's engines
+        hedge_executor = None
+        if hedging:
+            hedge_executor = ThreadPoolExecutor(max_workers=search_threads)
+            print(f"Hedging searches across {hedge_k} engine(s)" + (f", adding one every {hedge_delay}s" if hedge_delay is not None else ""))
+        
+        cache = None
+        if cache_file:
+            cache = ResultCache(cache_file, ttl=cache_ttl_days * 86400, negative_ttl=negative_ttl_days * 86400)
+            print(f"Using result cache: {cache_file}")
+        
+        # Emails found by earlier runs answer their rows without a search
+        known = None
+        if known_answers_file:
+            known = KnownAnswers(known_answers_file, batch_size)
+            print(f"Using known answers store: {known_answers_file}")
+        
+        # Sampled copies of result pages for debugging selectors
+        debug_capture = None
+        if debug_dir:
+            debug_capture = DebugCapture(debug_dir, sample_rate=debug_sample)
+            print(f"Capturing missed and {debug_sample:.0%} of other result pages to {debug_dir}")
+        
+        # Learn which engines answer best and fastest, starting from the last run's statistics
+        bandit = None
+        if adaptive:
+            bandit = EngineBandit(search_engines_order, engine_stats_file)
+            print("Ordering engines adaptively" + (f", statistics in {engine_stats_file}" if engine_stats_file else ""))
+        
+        # Every fetched page is kept so extraction can be rerun offline
+        archive = None
+        if archive_file:
+            archive = SerpArchive(archive_file)
+            print(f"Archiving result pages to {archive_file}")
+        
+        # Parse search result pages in worker processes so parsing overlaps with fetching
+        parse_pool = None
+        if parse_workers:
+            parse_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=worker_context())
+            print(f"Parsing results in {parse_workers} worker processes")
+        
+        context = LookupContext(
+            search_engines_order,
+            buffer_output=concurrency > 1,
+            scheduler=scheduler,
+            hedge_k=hedge_k,
+            hedge_delay=hedge_delay,
+            hedge_executor=hedge_executor,
+            cache=cache,
+            parse_pool=parse_pool,
+            debug_capture=debug_capture,
+            archive=archive,
+            confidence=confidence,
+            min_score=min_score,
+            bandit=bandit
+        )
+        
+        # Results are committed to the output file in batches by a single writer
+        with RESULT_WRITERS[output_format](output_file, batch_size, batch_seconds) as writer:
+            def write_rows(group, email, link):
+                for data in group:
+                    writer.write([
+                        data["first_name"], 
+                        data["last_name"], 
+                        data["phone"], 
+                        data["full_name"],
+                        email, 
+                        link
+                    ])
+                    stats["written"] += 1
             
-            # Write headers only if file doesn't exist
-            if not file_exists:
-                writer.writerow(["First Name", "Last Name", "Phone", "Full Name", "Email", "Source Link"])
+            # Rows reach the writer in input order, whatever order their lookups finish in
+            ordered = OrderedResults(lambda data, email, link: write_rows([data], email, link))
             
-            for idx, data in enumerate(data_list, 1):
-                first_name = data["first_name"]
-                last_name = data["last_name"]
-                phone_number = data["phone"]
-                full_name = data["full_name"]
-                
-                # Use one optimized query per search engine
-                query = f"Email for realtor {first_name} {last_name}, {phone_number}"
-                
-                email = ''
-                link = ''
-                successful_search = False
-                engines_tried = 0
-                
-                print(f"[{idx}/{len(data_list)}] Searching for: {full_name} - {phone_number}")
-                
-                # Try search engines in order until we find an email
-                for search_engine in search_engines_order:
-                    if successful_search:
-                        break
-                        
-                    engines_tried += 1
-                    print(f"  Trying search engine {engines_tried}/{len(search_engines_order)}: {search_engine}")
+            # Lookups in flight, the rows waiting on each, and recently finished results for later duplicates
+            # Finished results are kept for the most recent FINISHED_RESULTS people only, so memory
+            # stays flat on large inputs, and an older duplicate goes through the known answers
+            # store or the result cache instead
+            pending = {}
+            waiting = {}
+            finished = OrderedDict()
+            
+            def remember(key, answer):
+                finished[key] = answer
+                if len(finished) > FINISHED_RESULTS:
+                    finished.popitem(last=False)
+            
+            def collect():
+                """Wait for at least one lookup and write its rows"""
+                done, _ = wait(pending, timeout=batch_seconds, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = pending.pop(future)
+                    email, link, score = future.result()
+                    if dedupe:
+                        remember(key, (email, link))
+                    group = waiting.pop(key)
+                    if known:
+                        known.add(group[0][1]["key"], email, link, score)
+                    # Hand the result to the writer, for every row waiting on it
+                    for turn, data in group:
+                        ordered.finish(turn, data, email, link)
+                writer.commit_if_due()
+            
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for data in rows:
+                    stats["read"] += 1
+                    
+                    # Rows held back for ordering are bounded too, so a slow lookup pauses
+                    # reading instead of letting rows answered after it pile up in memory
+                    while ordered.waiting() >= queue_size * 4:
+                        collect()
                     
-                    try:
-                        search_results_html = search_realtor_info(query, search_engine)
-                        
-                        if search_results_html:
-                            email, link = extract_emails_and_links(search_results_html, search_engine)
-                            if email:
-                                print(f"    ✓ Found email: {email} (via {search_engine})")
-                                successful_search = True
-                            else:
-                                print(f"    - No email found in {search_engine} results")
-                        else:
-                            print(f"    - {search_engine} search failed")
-                            
-                    except Exception as e:
-                        print(f"    - Error with {search_engine}: {e}")
+                    # Search once per unique person and fan the result out to every matching row
+                    key = data["key"] if dedupe else stats["read"]
+                    if key in finished:
+                        finished.move_to_end(key)
+                        ordered.finish(ordered.take_turn(), data, *finished[key])
+                        writer.commit_if_due()
                         continue
+                    if key in waiting:
+                        waiting[key].append((ordered.take_turn(), data))
+                        continue
+                    
+                    answer = known.answer(data, confidence) if known else None
+                    if answer:
+                        stats["known"] += 1
+                        if dedupe:
+                            remember(key, answer)
+                        # Written in turn, after any earlier rows still being looked up
+                        ordered.finish(ordered.take_turn(), data, *answer)
+                        writer.commit_if_due()
+                        continue
+                    
+                    # Bounded window of queued lookups, reading pauses while it is full
+                    while len(pending) >= queue_size:
+                        collect()
+                    
+                    stats["lookups"] += 1
+                    waiting[key] = [(ordered.take_turn(), data)]
+                    pending[executor.submit(process_row, data, stats["lookups"], None, context)] = key
                 
-                if not successful_search:
-                    print(f"  ✗ No email found for {full_name} after trying {engines_tried} search engines")
-                
-                # Write result to CSV immediately
-                writer.writerow([
-                    data["first_name"], 
-                    data["last_name"], 
-                    data["phone"], 
-                    data["full_name"],
-                    email, 
-                    link
-                ])
-                
-                # Flush to ensure data is written immediately
-                file.flush()
+                while pending:
+                    collect()
+            
+            if dedupe:
+                print(f"Deduplicated {stats['read'] - stats['known']} rows to {stats['lookups']} unique lookups ({stats['read'] - stats['known'] - stats['lookups']} saved)")
+            
+            # Hedged attempts still running use the cache, archive, parse pool and engine
+            # statistics, so they finish before any of those are closed
+            if hedge_executor:
+                hedge_executor.shutdown(wait=True, cancel_futures=True)
+        
+        if parse_pool:
+            parse_pool.shutdown()
+        
+        if bandit:
+            bandit.save()
+            print("Engine statistics:")
+            print("\n".join(bandit.summary()))
+        
+        if archive:
+            pages, stored, original = archive.stats()
+            archive.close()
+            print(f"Archive holds {pages} pages in {stored / 1e6:.1f} MB")
+        
+        if debug_capture:
+            debug_capture.close()
+            print(f"Saved {debug_capture.captured} debug pages to {debug_capture.directory}" + (f" ({debug_capture.dropped} dropped)" if debug_capture.dropped else ""))
+        
+        if known:
+            known.close()
+            print(f"Known answers used: {stats['known']}, new answers stored: {known.added}")
+        
+        if cache:
+            print(f"Cache hits: {cache.hits}, searches run: {cache.misses}")
+            cache.close()
 
         print(f"\nScraping completed. Results appended to {output_file}")
-        print(f"Processed {len(data_list)} records")
+        if resume:
+            print(f"Skipped {stats['skipped']} rows already in the output file")
+        print(f"Processed {stats['written']} records")
     except Exception as e:
         print(f"An error occurred: {e}")
         import traceback
@@ -669,23 +2251,183 @@ def main():
     parser.add_argument('--output-file', '-o', default='phone_email_output.csv',
                         help='Output CSV file (default: phone_email_output.csv)')
     parser.add_argument('--engine', default='duckduckgo',
-                        choices=['duckduckgo', 'bing', 'google', 'yahoo', 'ask', 'yandex', 'ecosia', 'startpage', 'searx'],
+                        choices=list(ENGINES),
                         help='Primary search engine (default: duckduckgo)')
+    parser.add_argument('--concurrency', '-c', type=int, default=1,
+                        help='Number of rows to look up at the same time (default: 1)')
+    parser.add_argument('--pool-size', type=int, default=10,
+                        help='Keep-alive connections kept open per search engine, raised to the number of search threads (default: 10)')
+    parser.add_argument('--rate-limit', action='append', default=[], metavar='ENGINE=RATE[:BURST]',
+                        help='Override an engine\'s requests per second, and burst size when given (repeatable)')
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help='Send requests as fast as engines answer')
+    parser.add_argument('--hedge', type=int, default=1, metavar='K',
+                        help='Query the top K engines at once and keep the first email found (default: 1)')
+    parser.add_argument('--hedge-delay', type=float, default=None, metavar='SECONDS',
+                        help='Also ask the next engine when no answer arrives within this many seconds')
+    parser.add_argument('--cache-file', nargs='?', const='search_cache.db', default=None,
+                        help='Reuse search results stored in this SQLite file (default when given without a path: search_cache.db)')
+    parser.add_argument('--cache-ttl', type=float, default=30,
+                        help='Days a found email stays cached (default: 30)')
+    parser.add_argument('--negative-ttl', type=float, default=3,
+                        help='Days a "no email found" result stays cached (default: 3)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip rows that are already in the output file')
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help='Search every row even when the same person appears more than once')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Worker processes for parsing result pages (default: 0, parse in the fetching thread)')
+    parser.add_argument('--queue-size', type=int, default=None,
+                        help='Rows read ahead of the searches (default: 4 x concurrency)')
+    parser.add_argument('--csv-index', action='store_true',
+                        help='Keep a row offset index next to CSV input so --start-index seeks straight to the row')
+    parser.add_argument('--shard', default=None, metavar='K/N',
+                        help='Only process shard K of N, e.g. 1/4 on the first of four machines')
+    parser.add_argument('--shard-by', default='hash', choices=['hash', 'stride'],
+                        help='Split rows by a hash of the person (default) or round robin by row number')
+    
+    parser.add_argument('--output-format', default=None, choices=list(RESULT_WRITERS),
+                        help='Output format (default: from the output file extension, otherwise csv)')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='Rows committed to the output together (default: 100)')
+    parser.add_argument('--batch-seconds', type=float, default=2.0,
+                        help='Longest a finished row waits before being committed (default: 2)')
+    parser.add_argument('--known-answers', default='known_answers.db',
+                        help='Store of emails found by earlier runs, checked before searching (default: known_answers.db)')
+    parser.add_argument('--no-known-answers', action='store_true',
+                        help='Search every row even if an earlier run already found its email')
+    parser.add_argument('--debug-pages', nargs='?', const='debug_pages', default=None, metavar='DIR',
+                        help='Keep gzipped result pages where no email was found, plus a sample of the rest (default folder: debug_pages)')
+    parser.add_argument('--debug-sample', type=float, default=0.01,
+                        help='Share of pages with an email that --debug-pages also keeps (default: 0.01)')
+    parser.add_argument('--confidence', type=float, default=0.7,
+                        help='Email score (0-1) that ends the search for a row, lower scores try the next engine (default: 0.7)')
+    parser.add_argument('--min-score', type=float, default=0.3,
+                        help='Lowest email score kept when no engine reaches --confidence (default: 0.3)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Order engines per row by their learned hit rate and speed instead of the fixed order')
+    parser.add_argument('--engine-stats', default='engine_stats.json',
+                        help='File the learned engine statistics are loaded from and saved to (default: engine_stats.json)')
+    parser.add_argument('--engine-base-url', default=None, metavar='URL',
+                        help='Send every search to URL/<engine>/... instead of the real engines, e.g. a local test server')
+    parser.add_argument('--archive', nargs='?', const='serps.pack', default=None, metavar='PACK',
+                        help='Append every fetched result page to a compressed archive (default file: serps.pack)')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    merge_parser = subparsers.add_parser('merge', help='Merge per-shard output files back into input order')
+    merge_parser.add_argument('shard_files', nargs='+',
+                              help='Output files written by the shard runs')
+    merge_parser.add_argument('--input-file', '-i', required=True,
+                              help='Input file the shards were run on')
+    merge_parser.add_argument('--output-file', '-o', required=True,
+                              help='Merged CSV file to write')
+    merge_parser.add_argument('--start-index', '-s', type=int, default=1,
+                              help='Start index the shards were run with (default: 1)')
+    merge_parser.add_argument('--end-index', '-e', type=int, default=None,
+                              help='End index the shards were run with (default: end of file)')
+    
+    consolidate_parser = subparsers.add_parser('consolidate', help='Merge historical result files into one deduplicated master file')
+    consolidate_parser.add_argument('paths', nargs='+',
+                                    help='Result files or folders of result files')
+    consolidate_parser.add_argument('--output-file', '-o', required=True,
+                                    help='Master CSV file to write')
+    consolidate_parser.add_argument('--chunk-rows', type=int, default=200000,
+                                    help='Rows sorted in memory at a time (default: 200000)')
+    
+    import_parser = subparsers.add_parser('import-answers', help='Load historical result files into the known answers store')
+    import_parser.add_argument('paths', nargs='+',
+                               help='Result files or folders of result files')
+    import_parser.add_argument('--known-answers', default='known_answers.db',
+                               help='Known answers store to fill (default: known_answers.db)')
+    import_parser.add_argument('--min-score', type=float, default=0.3,
+                               help='Lowest score, against its row, of an email worth importing (default: 0.3)')
+    
+    extract_parser = subparsers.add_parser('extract', help='Rerun email extraction over saved result pages, without searching')
+    extract_parser.add_argument('pages', nargs='+',
+                                help='Saved .html/.html.gz pages, folders of them, or an archive pack file')
+    extract_parser.add_argument('--page-engine', default='yahoo', choices=list(ENGINES),
+                                help='Engine of pages whose folder or file name names none (default: yahoo)')
+    extract_parser.add_argument('--workers', type=int, default=None,
+                                help='Worker processes (default: one per CPU)')
+    extract_parser.add_argument('--results', default=None,
+                                help='CSV file to write the per-page results to')
+    extract_parser.add_argument('--compare', default=None,
+                                help='Results CSV of an earlier run to report differences against')
+    extract_parser.add_argument('--show-diffs', type=int, default=20,
+                                help='Differences to list (default: 20)')
     
     args = parser.parse_args()
     
+    if args.command == 'extract':
+        extract_offline(args.pages, args.page_engine, args.workers, args.results, args.compare, args.show_diffs,
+                        confidence=args.confidence, min_score=args.min_score)
+        return
+    
+    if args.command == 'consolidate':
+        consolidate_results(args.paths, args.output_file, args.chunk_rows)
+        return
+    
+    if args.command == 'import-answers':
+        import_known_answers(args.paths, args.known_answers, args.min_score)
+        return
+    
     # Check if input file exists
     if not os.path.exists(args.input_file):
         print(f"Error: Input file '{args.input_file}' not found!")
         sys.exit(1)
     
+    if args.command == 'merge':
+        merge_shard_outputs(args.input_file, args.shard_files, args.output_file, args.start_index, args.end_index)
+        return
+    
+    try:
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    try:
+        rate_limits = False if args.no_rate_limit else parse_rate_limits(args.rate_limit)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if args.engine_base_url:
+        set_engine_base_url(args.engine_base_url)
+    
     # Run the scraper
     run_scraper(
         file_path=args.input_file,
         start_index=args.start_index,
         end_index=args.end_index,
         primary_engine=args.engine,
-        output_file=args.output_file
+        output_file=args.output_file,
+        concurrency=args.concurrency,
+        pool_size=args.pool_size,
+        rate_limits=rate_limits,
+        hedge_k=args.hedge,
+        hedge_delay=args.hedge_delay,
+        cache_file=args.cache_file,
+        cache_ttl_days=args.cache_ttl,
+        negative_ttl_days=args.negative_ttl,
+        resume=args.resume,
+        dedupe=not args.no_dedupe,
+        parse_workers=args.parse_workers,
+        queue_size=args.queue_size,
+        csv_index=args.csv_index,
+        shard=shard,
+        shard_mode=args.shard_by,
+        output_format=args.output_format,
+        batch_size=args.batch_size,
+        batch_seconds=args.batch_seconds,
+        known_answers_file=None if args.no_known_answers else args.known_answers,
+        debug_dir=args.debug_pages,
+        debug_sample=args.debug_sample,
+        archive_file=args.archive,
+        confidence=args.confidence,
+        min_score=args.min_score,
+        adaptive=args.adaptive,
+        engine_stats_file=args.engine_stats
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+import os
+import mmap
+import struct
+import sqlite3
+import threading
+import time
+import zlib
+import argparse
+from datetime import datetime
+from urllib.request import pathname2url
+
+# Append-only archive of fetched search result pages
+# Pages are zlib compressed one by one into a pack file so any page can be read
+# back on its own, and a SQLite index maps (query, engine, time) to its offset
+
+# Every record starts with: magic, fetch time, query length, engine length, page length
+RECORD_HEADER = struct.Struct("<4sdHHI")
+RECORD_MAGIC = b"SERP"
+
+# Function to normalize a query so formatting differences share an index entry
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+class SerpArchive:
+    """
+    Pack file '<path>' holding compressed pages, with the index in '<path>.db'
+    add() is safe to call from many threads, reads go through a memory map of the pack
+    The records carry their own query and engine, so a lost index can be rebuilt
+    With read_only set nothing is written, indexed or truncated, so readers can
+    open an archive that a run is still adding to
+    """
+    def __init__(self, path, level=9, commit_every=100, read_only=False):
+        self.path = path
+        self.level = level
+        self.commit_every = commit_every
+        self.read_only = read_only
+        self.lock = threading.Lock()
+        self.uncommitted = 0
+        self.map = None
+        self.map_size = 0
+        if read_only:
+            self.pack = None
+            uri = "file:" + pathname2url(os.path.abspath(path + ".db")) + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        
+        self.pack = open(path, "ab")
+        self.conn = sqlite3.connect(path + ".db", check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "query TEXT NOT NULL, engine TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "offset INTEGER NOT NULL, length INTEGER NOT NULL, size INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_lookup ON pages (query, engine, fetched_at)")
+        self.conn.commit()
+
+        # Index records written after the last commit of an interrupted run
+        indexed_end = self.conn.execute("SELECT COALESCE(MAX(offset + length), 0) FROM pages").fetchone()[0]
+        if indexed_end < os.path.getsize(path):
+            self.reindex(indexed_end)
+
+    def add(self, query, engine, html, fetched_at=None):
+        """Compress and append one page, returns its offset in the pack"""
+        if self.read_only:
+            raise ValueError(f"Archive {self.path} is open read-only")
+        fetched_at = fetched_at or time.time()
+        query_bytes = normalize_query(query).encode("utf-8")
+        engine_bytes = engine.encode("utf-8")
+        page = html.encode("utf-8")
+        payload = zlib.compress(page, self.level)
+        record = RECORD_HEADER.pack(RECORD_MAGIC, fetched_at, len(query_bytes), len(engine_bytes), len(payload))
+        record += query_bytes + engine_bytes + payload
+
+        with self.lock:
+            # The size of the file rather than tell(), which goes stale once reindex truncates
+            offset = os.fstat(self.pack.fileno()).st_size
+            self.pack.write(record)
+            self.pack.flush()
+            self.conn.execute(
+                "INSERT INTO pages (query, engine, fetched_at, offset, length, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (query_bytes.decode("utf-8"), engine, fetched_at, offset, len(record), len(page))
+            )
+            self.uncommitted += 1
+            if self.uncommitted >= self.commit_every:
+                self.conn.commit()
+                self.uncommitted = 0
+        return offset
+
+    def reindex(self, start=0):
+        """Add index entries for the records from byte offset start to the end of the pack"""
+        if self.read_only:
+            raise ValueError(f"Archive {self.path} is open read-only")
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            added = 0
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                magic, fetched_at, query_length, engine_length, payload_length = RECORD_HEADER.unpack(header)
+                if magic != RECORD_MAGIC:
+                    raise ValueError(f"Corrupt archive record at offset {offset}")
+                names = f.read(query_length + engine_length)
+                payload = f.read(payload_length)
+                if len(payload) < payload_length:
+                    break
+                query = names[:query_length].decode("utf-8")
+                engine = names[query_length:].decode("utf-8")
+                length = RECORD_HEADER.size + query_length + engine_length + payload_length
+                size = len(zlib.decompress(payload))
+                self.conn.execute(
+                    "INSERT INTO pages (query, engine, fetched_at, offset, length, size) VALUES (?, ?, ?, ?, ?, ?)",
+                    (query, engine, fetched_at, offset, length, size)
+                )
+                offset += length
+                added += 1
+        self.conn.commit()
+        # Cut off a record that was only half written when a run was killed
+        if offset < os.path.getsize(self.path):
+            self.pack.truncate(offset)
+            self.pack.seek(0, os.SEEK_END)
+        print(f"Reindexed {added} archived pages")
+
+    def read(self, offset, length):
+        """Return the page stored in the record at offset"""
+        if self.map is None or offset + length > self.map_size:
+            with self.lock:
+                if self.pack is not None:
+                    self.pack.flush()
+                # The old map is left to other readers still using it
+                self.map_size = os.path.getsize(self.path)
+                with open(self.path, "rb") as f:
+                    self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, query_length, engine_length, payload_length = RECORD_HEADER.unpack_from(self.map, offset)
+        start = offset + RECORD_HEADER.size + query_length + engine_length
+        return zlib.decompress(self.map[start:start + payload_length]).decode("utf-8")
+
+    def get(self, query, engine, at=None):
+        """Return (fetched_at, html) of the newest page for this query and engine, fetched at or before at"""
+        row = self.conn.execute(
+            "SELECT fetched_at, offset, length FROM pages WHERE query = ? AND engine = ? AND fetched_at <= ? "
+            "ORDER BY fetched_at DESC LIMIT 1",
+            (normalize_query(query), engine, at or float("inf"))
+        ).fetchone()
+        if row is None:
+            return None
+        fetched_at, offset, length = row
+        return fetched_at, self.read(offset, length)
+
+    def entries(self, engine=None, since=None, until=None):
+        """List (query, engine, fetched_at, offset, length) in pack order, for reading pages in bulk"""
+        self.commit()
+        sql = "SELECT query, engine, fetched_at, offset, length FROM pages WHERE fetched_at BETWEEN ? AND ?"
+        params = [since or 0, until or float("inf")]
+        if engine:
+            sql += " AND engine = ?"
+            params.append(engine)
+        return self.conn.execute(sql + " ORDER BY offset", params).fetchall()
+
+    def iter_pages(self, engine=None, since=None, until=None):
+        """Yield (query, engine, fetched_at, html) for every archived page"""
+        for query, page_engine, fetched_at, offset, length in self.entries(engine, since, until):
+            yield query, page_engine, fetched_at, self.read(offset, length)
+
+    def stats(self):
+        pages, stored, original = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(size), 0) FROM pages"
+        ).fetchone()
+        return pages, stored, original
+
+    def commit(self):
+        if self.read_only:
+            return
+        with self.lock:
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        with self.lock:
+            if self.pack is not None:
+                self.pack.close()
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Inspect an archive of search result pages')
+    parser.add_argument('archive', help='Archive pack file')
+    parser.add_argument('--query', help='Print the newest page archived for this query')
+    parser.add_argument('--engine', help='Engine of the page to print, or to count pages for')
+    parser.add_argument('--reindex', action='store_true',
+                        help='Rebuild the index from the pack file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"Error: Archive '{args.archive}' not found")
+        raise SystemExit(1)
+
+    if args.reindex and os.path.exists(args.archive + ".db"):
+        os.remove(args.archive + ".db")
+    archive = SerpArchive(args.archive, read_only=os.path.exists(args.archive + ".db"))
+    if args.query:
+        page = archive.get(args.query, args.engine or "yahoo")
+        if page is None:
+            print("No archived page for that query")
+        else:
+            print(page[1])
+    else:
+        pages, stored, original = archive.stats()
+        print(f"{pages} pages, {stored / 1e6:.1f} MB stored for {original / 1e6:.1f} MB of HTML"
+              + (f" ({original / stored:.1f}x)" if stored else ""))
+        for engine, count, first, last in archive.conn.execute(
+                "SELECT engine, COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM pages GROUP BY engine"):
+            if args.engine in (None, engine):
+                print(f"  {engine}: {count} pages, {datetime.fromtimestamp(first):%Y-%m-%d} to {datetime.fromtimestamp(last):%Y-%m-%d}")
+    archive.close()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from serp_archive import SerpArchive
+
+class CrashThenAppendTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "serps.pack")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_append_after_torn_record(self):
+        archive = SerpArchive(self.path)
+        archive.add("Email for realtor Amanda Osgood", "yahoo", "<html>first</html>")
+        archive.close()
+
+        # A run killed while writing leaves half a record behind
+        with open(self.path, "ab") as f:
+            f.write(b"SERP\x00\x01\x02")
+
+        archive = SerpArchive(self.path)
+        offset = archive.add("Email for realtor Paul Hunt", "yahoo", "<html>second</html>")
+        self.assertEqual(offset, archive.entries()[1][3])
+        self.assertEqual(archive.get("Email for realtor Amanda Osgood", "yahoo")[1], "<html>first</html>")
+        self.assertEqual(archive.get("Email for realtor Paul Hunt", "yahoo")[1], "<html>second</html>")
+        archive.close()
+
+        # The index is rebuilt the same way from the repaired pack
+        os.remove(self.path + ".db")
+        archive = SerpArchive(self.path)
+        self.assertEqual(archive.get("Email for realtor Paul Hunt", "yahoo")[1], "<html>second</html>")
+        archive.close()
+
+    def test_read_only_leaves_archive_untouched(self):
+        archive = SerpArchive(self.path)
+        archive.add("Email for realtor Amanda Osgood", "yahoo", "<html>first</html>")
+        archive.close()
+
+        # A record still being written by a running scrape
+        with open(self.path, "ab") as f:
+            f.write(b"SERP\x00\x01\x02")
+        size = os.path.getsize(self.path)
+
+        archive = SerpArchive(self.path, read_only=True)
+        self.assertEqual(archive.get("Email for realtor Amanda Osgood", "yahoo")[1], "<html>first</html>")
+        self.assertEqual(len(archive.entries()), 1)
+        with self.assertRaises(ValueError):
+            archive.add("Email for realtor Paul Hunt", "yahoo", "<html>second</html>")
+        archive.close()
+        self.assertEqual(os.path.getsize(self.path), size)
+
+if __name__ == "__main__":
+    unittest.main()
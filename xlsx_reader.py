@@ -0,0 +1,164 @@
+import zipfile
+import posixpath
+import argparse
+import os
+import time
+from lxml import etree
+
+# Streaming reader for the first columns of an .xlsx sheet
+# Reads the sheet XML straight out of the zip instead of building openpyxl cell objects
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+ROW_TAG = f"{{{MAIN_NS}}}row"
+CELL_TAG = f"{{{MAIN_NS}}}c"
+VALUE_TAG = f"{{{MAIN_NS}}}v"
+INLINE_TAG = f"{{{MAIN_NS}}}is"
+TEXT_TAG = f"{{{MAIN_NS}}}t"
+PHONETIC_TAG = f"{{{MAIN_NS}}}rPh"
+
+# Function to turn a cell reference like "AB12" into a zero based column index
+def column_index(reference):
+    index = 0
+    for char in reference:
+        if "A" <= char <= "Z":
+            index = index * 26 + ord(char) - 64
+        else:
+            break
+    return index - 1
+
+# Function to read the text of a shared or inline string, skipping phonetic hints
+def string_text(element):
+    return "".join(
+        t.text or ""
+        for t in element.iter(TEXT_TAG)
+        if t.getparent().tag != PHONETIC_TAG
+    )
+
+# Function to find the sheet openpyxl would open as the active one
+def active_sheet_path(archive):
+    workbook = etree.fromstring(archive.read("xl/workbook.xml"))
+    active_tab = 0
+    view = workbook.find(f"{{{MAIN_NS}}}bookViews/{{{MAIN_NS}}}workbookView")
+    if view is not None:
+        active_tab = int(view.get("activeTab", 0))
+    sheets = workbook.findall(f"{{{MAIN_NS}}}sheets/{{{MAIN_NS}}}sheet")
+    if not sheets:
+        raise ValueError("Workbook has no sheets")
+    sheet = sheets[active_tab] if active_tab < len(sheets) else sheets[0]
+    rel_id = sheet.get(f"{{{REL_NS}}}id")
+
+    rels = etree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError(f"Sheet relationship {rel_id} not found")
+
+# Function to load the shared string table once
+def load_shared_strings(archive):
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, si in etree.iterparse(f, tag=f"{{{MAIN_NS}}}si"):
+            strings.append(string_text(si))
+            si.clear()
+    return strings
+
+# Function to convert a raw cell to the value openpyxl would return
+def cell_value(cell, shared_strings):
+    cell_type = cell.get("t", "n")
+    if cell_type == "inlineStr":
+        inline = cell.find(INLINE_TAG)
+        return string_text(inline) if inline is not None else None
+    value = cell.findtext(VALUE_TAG)
+    # An empty <v></v>, like a formula saved without its result, reads as None in openpyxl too
+    if not value:
+        return None
+    if cell_type == "s":
+        return shared_strings[int(value)]
+    if cell_type == "n":
+        if "." in value or "E" in value or "e" in value:
+            return float(value)
+        return int(value)
+    if cell_type == "b":
+        return bool(int(value))
+    return value
+
+def iter_xlsx_columns(file_path, columns, start_index=0, end_index=None):
+    """
+    Yield (row_index, values) for the active sheet, values holding only the requested columns
+    Row indexes are zero based like enumerate(sheet.iter_rows()), rows the sheet
+    doesn't store are skipped since they have no values anyway
+    """
+    wanted = {column: position for position, column in enumerate(columns)}
+    last_wanted = max(columns)
+    with zipfile.ZipFile(file_path) as archive:
+        shared_strings = load_shared_strings(archive)
+        with archive.open(active_sheet_path(archive)) as sheet:
+            next_index = 0
+            for _, row in etree.iterparse(sheet, tag=ROW_TAG):
+                row_number = row.get("r")
+                index = int(row_number) - 1 if row_number else next_index
+                next_index = index + 1
+                if end_index is not None and index >= end_index:
+                    break
+
+                if index >= start_index:
+                    values = [None] * len(columns)
+                    position = -1
+                    for cell in row.iterchildren(CELL_TAG):
+                        reference = cell.get("r")
+                        position = column_index(reference) if reference else position + 1
+                        if position > last_wanted:
+                            break
+                        slot = wanted.get(position)
+                        if slot is not None:
+                            values[slot] = cell_value(cell, shared_strings)
+                    yield index, values
+
+                # Free parsed rows so memory stays flat on large sheets
+                row.clear()
+                while row.getprevious() is not None:
+                    del row.getparent()[0]
+
+# Function to compare this reader with openpyxl's read-only mode on a generated workbook
+def benchmark(rows=100000, file_path="xlsx_reader_benchmark.xlsx"):
+    import openpyxl
+
+    if not os.path.exists(file_path):
+        print(f"Writing {rows} row benchmark workbook '{file_path}'...")
+        wb = openpyxl.Workbook(write_only=True)
+        sheet = wb.create_sheet()
+        sheet.append(["First Name", "Last Name", "Phone", "Company", "City", "Notes"])
+        for i in range(rows):
+            sheet.append([f"First{i % 5000}", f"Last{i % 7919}", 15120000000 + i, "Realty Group", "Austin", "Lorem ipsum dolor sit amet"])
+        wb.save(file_path)
+
+    start = time.perf_counter()
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    openpyxl_rows = [(r[0].value, r[1].value, r[2].value) for r in wb.active.iter_rows()]
+    wb.close()
+    openpyxl_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast_rows = [tuple(values) for _, values in iter_xlsx_columns(file_path, [0, 1, 2])]
+    fast_time = time.perf_counter() - start
+
+    print(f"openpyxl read-only: {openpyxl_time:.2f}s for {len(openpyxl_rows)} rows")
+    print(f"xlsx_reader:        {fast_time:.2f}s for {len(fast_rows)} rows")
+    print(f"Speedup: {openpyxl_time / fast_time:.1f}x, identical values: {openpyxl_rows == fast_rows}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the streaming XLSX reader against openpyxl')
+    parser.add_argument('--rows', type=int, default=100000,
+                        help='Rows in the generated benchmark workbook (default: 100000)')
+    parser.add_argument('--file', default='xlsx_reader_benchmark.xlsx',
+                        help='Benchmark workbook, created if missing (default: xlsx_reader_benchmark.xlsx)')
+    args = parser.parse_args()
+    benchmark(args.rows, args.file)